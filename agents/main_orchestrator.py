@@ -10,7 +10,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 from .base_agent import AgentExecutionContext, Task, TaskPriority
-from .workflows.workflow_engine import workflow_engine, WorkflowEngine
+from .workflows.workflow_engine import get_workflow_engine, WorkflowEngine
 from .workflows.predefined_workflows import get_workflow_template, list_workflow_templates
 from .workflows.workflow_examples import WorkflowExamples
 from .orchestrator.orchestrator_agent import OrchestratorAgent
@@ -27,7 +27,7 @@ class MainOrchestrator:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.workflow_engine = workflow_engine
+        self.workflow_engine = get_workflow_engine()
         self.agents = {}
         self._initialize_agents()
         
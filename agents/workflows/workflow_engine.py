@@ -1,8 +1,12 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+import sys
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
 
@@ -21,14 +25,21 @@ class WorkflowStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-@dataclass
+_FINISHED_STATUSES = frozenset({WorkflowStatus.COMPLETED, WorkflowStatus.FAILED, WorkflowStatus.CANCELLED})
+
+# Finished workflows stay in active_workflows for this long before being archived
+WORKFLOW_TTL_SECONDS = 3600
+# Result summaries of archived workflows kept for get_workflow_status; the oldest are dropped first
+WORKFLOW_ARCHIVE_MAX_SIZE = 1000
+
+@dataclass(slots=True)
 class WorkflowStep:
     id: str
     name: str
     agent_type: str
     task_type: str
     inputs: Dict[str, Any]
-    dependencies: List[str] = None
+    dependencies: Tuple[str, ...] = ()
     timeout: int = 300
     retry_count: int = 3
     status: str = "pending"
@@ -36,12 +47,8 @@ class WorkflowStep:
     error: Optional[str] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
-    
-    def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
 
-@dataclass
+@dataclass(slots=True)
 class Workflow:
     id: str
     name: str
@@ -60,25 +67,62 @@ class Workflow:
         if self.results is None:
             self.results = {}
 
+class AgentRegistry(MutableMapping):
+    """Mapping of agent name to agent that constructs agents lazily from factories"""
+    
+    def __init__(self, factories: Optional[Dict[str, Callable[[], BaseAgent]]] = None):
+        self._factories: Dict[str, Callable[[], BaseAgent]] = dict(factories or {})
+        self._instances: Dict[str, BaseAgent] = {}
+    
+    def __getitem__(self, name: str) -> BaseAgent:
+        agent = self._instances.get(name)
+        if agent is None:
+            agent = self._factories[name]()
+            self._instances[name] = agent
+        return agent
+    
+    def __setitem__(self, name: str, agent: BaseAgent):
+        self._instances[name] = agent
+    
+    def __delitem__(self, name: str):
+        found = self._instances.pop(name, None) is not None
+        found = self._factories.pop(name, None) is not None or found
+        if not found:
+            raise KeyError(name)
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self._factories
+        for name in self._instances:
+            if name not in self._factories:
+                yield name
+    
+    def __len__(self) -> int:
+        return len(self._factories.keys() | self._instances.keys())
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._instances or name in self._factories
+
 class WorkflowEngine:
     """Engine for executing multi-agent workflows"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.active_workflows: Dict[str, Workflow] = {}
-        self.agents: Dict[str, BaseAgent] = {}
+        # Result summaries of finished workflows pruned from active_workflows
+        self.archived_workflows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.agents: AgentRegistry = AgentRegistry()
         self._initialize_agents()
         
     def _initialize_agents(self):
-        """Initialize all available agents"""
-        self.agents = {
-            "orchestrator": OrchestratorAgent(),
-            "planner": PlannerAgent(),
-            "architecture": ArchitectureAgent(),
-            "backend": BackendAgent(),
-            "frontend": FrontendAgent()
-        }
-        self.logger.info(f"Initialized {len(self.agents)} agents")
+        """Register factories for all available agents; each is built on first use"""
+        self.agents = AgentRegistry({
+            "orchestrator": OrchestratorAgent,
+            "planner": PlannerAgent,
+            "architecture": ArchitectureAgent,
+            "backend": BackendAgent,
+            "frontend": FrontendAgent
+        })
+        self.logger.info(f"Registered {len(self.agents)} agents")
     
     def create_workflow(self, name: str, description: str, steps: List[Dict], context: AgentExecutionContext) -> str:
         """Create a new workflow"""
@@ -86,18 +130,22 @@ class WorkflowEngine:
         
         workflow_steps = []
         for step_data in steps:
+            # Interned ids make scheduler set/dict lookups pointer comparisons
             step = WorkflowStep(
-                id=step_data["id"],
+                id=sys.intern(step_data["id"]),
                 name=step_data["name"],
                 agent_type=step_data["agent_type"],
                 task_type=step_data["task_type"],
                 inputs=step_data.get("inputs", {}),
-                dependencies=step_data.get("dependencies", []),
+                dependencies=tuple(sys.intern(dep) for dep in step_data.get("dependencies", ())),
                 timeout=step_data.get("timeout", 300),
                 retry_count=step_data.get("retry_count", 3)
             )
             workflow_steps.append(step)
         
+        # Reject broken graphs before any agent is invoked
+        self._validate_dependencies(workflow_steps)
+        
         workflow = Workflow(
             id=workflow_id,
             name=name,
@@ -106,6 +154,8 @@ class WorkflowEngine:
             context=context
         )
         
+        # Pruning rides on workflow creation, the only point where active_workflows grows
+        self.prune_workflows()
         self.active_workflows[workflow_id] = workflow
         self.logger.info(f"Created workflow: {workflow_id} - {name}")
         return workflow_id
@@ -122,19 +172,12 @@ class WorkflowEngine:
         self.logger.info(f"Starting workflow execution: {workflow_id}")
         
         try:
-            # Build dependency graph
-            dependency_graph = self._build_dependency_graph(workflow.steps)
-            
-            # Execute steps in dependency order
-            execution_order = self._calculate_execution_order(dependency_graph)
+            # Materialize the schedule up front so cycles fail before any step runs
+            execution_order = list(self._schedule(workflow.steps))
             
             for step_batch in execution_order:
                 # Execute steps in parallel if they have no dependencies between them
-                tasks = []
-                for step_id in step_batch:
-                    step = next(s for s in workflow.steps if s.id == step_id)
-                    task = self._execute_step(step, workflow)
-                    tasks.append(task)
+                tasks = [self._execute_step(step, workflow) for step in step_batch]
                 
                 # Wait for all steps in batch to complete
                 results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -142,8 +185,8 @@ class WorkflowEngine:
                 # Check for failures
                 for i, result in enumerate(results):
                     if isinstance(result, Exception):
-                        step_id = step_batch[i]
-                        step = next(s for s in workflow.steps if s.id == step_id)
+                        step = step_batch[i]
+                        step_id = step.id
                         step.status = "failed"
                         step.error = str(result)
                         step.completed_at = datetime.utcnow()
@@ -247,35 +290,72 @@ class WorkflowEngine:
         
         return resolved_inputs
     
-    def _build_dependency_graph(self, steps: List[WorkflowStep]) -> Dict[str, List[str]]:
-        """Build dependency graph from workflow steps"""
-        graph = {}
+    def _schedule(self, steps: List[WorkflowStep]) -> Iterator[List[WorkflowStep]]:
+        """Yield batches of steps in dependency order (Kahn's algorithm, O(V+E))"""
+        step_by_id = {step.id: step for step in steps}
+        indegree = dict.fromkeys(step_by_id, 0)
+        children: Dict[str, List[str]] = {step_id: [] for step_id in step_by_id}
+        
         for step in steps:
-            graph[step.id] = step.dependencies.copy()
-        return graph
-    
-    def _calculate_execution_order(self, dependency_graph: Dict[str, List[str]]) -> List[List[str]]:
-        """Calculate execution order using topological sort"""
-        execution_order = []
-        remaining_nodes = set(dependency_graph.keys())
+            for dep in step.dependencies:
+                # Unknown dependencies are ignored, as they can never be satisfied by this workflow
+                if dep in step_by_id:
+                    indegree[step.id] += 1
+                    children[dep].append(step.id)
         
-        while remaining_nodes:
-            # Find nodes with no remaining dependencies
-            ready_nodes = []
-            for node in remaining_nodes:
-                if not any(dep in remaining_nodes for dep in dependency_graph[node]):
-                    ready_nodes.append(node)
-            
-            if not ready_nodes:
-                raise ValueError("Circular dependency detected in workflow")
-            
-            execution_order.append(ready_nodes)
-            remaining_nodes -= set(ready_nodes)
+        wave = deque(step_id for step_id, degree in indegree.items() if degree == 0)
+        scheduled = 0
+        
+        while wave:
+            next_wave = deque()
+            batch = []
+            while wave:
+                step_id = wave.popleft()
+                batch.append(step_by_id[step_id])
+                for child in children[step_id]:
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        next_wave.append(child)
+            scheduled += len(batch)
+            yield batch
+            wave = next_wave
+        
+        if scheduled != len(step_by_id):
+            blocked = ", ".join(step_id for step_id, degree in indegree.items() if degree)
+            raise ValueError(f"Circular dependency detected in workflow: {blocked}")
+    
+    def _validate_dependencies(self, steps: List[WorkflowStep]):
+        """Ensure every dependency refers to a step in the workflow and the graph is acyclic"""
+        step_ids = {step.id for step in steps}
+        for step in steps:
+            for dep in step.dependencies:
+                if dep not in step_ids:
+                    raise ValueError(f"Unknown dependency: step {step.id} depends on {dep}")
         
-        return execution_order
+        # Draining the scheduler raises on cycles
+        for _ in self._schedule(steps):
+            pass
     
     def _get_workflow_results(self, workflow: Workflow) -> Dict[str, Any]:
         """Get comprehensive workflow results"""
+        steps = []
+        completed_steps = failed_steps = 0
+        for step in workflow.steps:
+            if step.status == "completed":
+                completed_steps += 1
+            elif step.status == "failed":
+                failed_steps += 1
+            steps.append({
+                "id": step.id,
+                "name": step.name,
+                "status": step.status,
+                "started_at": step.started_at.isoformat() if step.started_at else None,
+                "completed_at": step.completed_at.isoformat() if step.completed_at else None,
+                "error": step.error,
+                "result": step.result
+            })
+        total_steps = len(steps)
+
         return {
             "workflow_id": workflow.id,
             "name": workflow.name,
@@ -287,47 +367,61 @@ class WorkflowEngine:
                 if workflow.started_at and workflow.completed_at
                 else None
             ),
-            "steps": [
-                {
-                    "id": step.id,
-                    "name": step.name,
-                    "status": step.status,
-                    "started_at": step.started_at.isoformat() if step.started_at else None,
-                    "completed_at": step.completed_at.isoformat() if step.completed_at else None,
-                    "error": step.error,
-                    "result": step.result
-                }
-                for step in workflow.steps
-            ],
+            "steps": steps,
             "results": workflow.results,
             "summary": {
-                "total_steps": len(workflow.steps),
-                "completed_steps": len([s for s in workflow.steps if s.status == "completed"]),
-                "failed_steps": len([s for s in workflow.steps if s.status == "failed"]),
-                "success_rate": len([s for s in workflow.steps if s.status == "completed"]) / len(workflow.steps) * 100
+                "total_steps": total_steps,
+                "completed_steps": completed_steps,
+                "failed_steps": failed_steps,
+                "success_rate": completed_steps / total_steps * 100
             }
         }
     
     def get_workflow_status(self, workflow_id: str) -> Dict[str, Any]:
         """Get current workflow status"""
-        if workflow_id not in self.active_workflows:
-            raise ValueError(f"Workflow not found: {workflow_id}")
+        workflow = self.active_workflows.get(workflow_id)
+        if workflow is not None:
+            return self._get_workflow_results(workflow)
         
-        workflow = self.active_workflows[workflow_id]
-        return self._get_workflow_results(workflow)
+        archived = self.archived_workflows.get(workflow_id)
+        if archived is None:
+            raise ValueError(f"Workflow not found: {workflow_id}")
+        return archived
     
-    def list_workflows(self) -> List[Dict[str, Any]]:
-        """List all workflows"""
-        return [
-            {
+    def iter_workflows(self) -> Iterator[Dict[str, Any]]:
+        """Lazily yield a summary of each active workflow"""
+        for workflow in self.active_workflows.values():
+            yield {
                 "id": workflow.id,
                 "name": workflow.name,
                 "status": workflow.status.value,
                 "created_at": workflow.created_at.isoformat(),
                 "step_count": len(workflow.steps)
             }
-            for workflow in self.active_workflows.values()
+    
+    def list_workflows(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """List workflows, materializing only the requested slice"""
+        stop = offset + limit if limit is not None else None
+        return list(islice(self.iter_workflows(), offset, stop))
+    
+    def prune_workflows(self, ttl_seconds: int = WORKFLOW_TTL_SECONDS) -> int:
+        """Archive the results of workflows that finished more than ``ttl_seconds`` ago"""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        expired = [
+            workflow_id
+            for workflow_id, workflow in self.active_workflows.items()
+            if workflow.status in _FINISHED_STATUSES
+            and workflow.completed_at is not None
+            and workflow.completed_at < cutoff
         ]
+        for workflow_id in expired:
+            self.archived_workflows[workflow_id] = self._get_workflow_results(self.active_workflows.pop(workflow_id))
+        while len(self.archived_workflows) > WORKFLOW_ARCHIVE_MAX_SIZE:
+            self.archived_workflows.popitem(last=False)
+        
+        if expired:
+            self.logger.info(f"Pruned {len(expired)} finished workflows")
+        return len(expired)
     
     def cancel_workflow(self, workflow_id: str) -> bool:
         """Cancel a running workflow"""
@@ -343,5 +437,12 @@ class WorkflowEngine:
         
         return False
 
-# Global workflow engine instance
-workflow_engine = WorkflowEngine()
\ No newline at end of file
+# Global workflow engine instance, created on first use by get_workflow_engine()
+workflow_engine: Optional[WorkflowEngine] = None
+
+def get_workflow_engine() -> WorkflowEngine:
+    """Return the global workflow engine, creating it on first call"""
+    global workflow_engine
+    if workflow_engine is None:
+        workflow_engine = WorkflowEngine()
+    return workflow_engine
\ No newline at end of file
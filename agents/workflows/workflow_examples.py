@@ -4,11 +4,25 @@ Example workflows and test cases for the agent system
 
 import asyncio
 import json
+import re
 from typing import Dict, Any
-from .workflow_engine import workflow_engine, WorkflowEngine
+from .workflow_engine import get_workflow_engine, WorkflowEngine
 from .predefined_workflows import get_workflow_template
 from ..base_agent import AgentExecutionContext
 
+_PLACEHOLDER_RE = re.compile(r"^\$\{workflow\.(\w+)\}$")
+
+def apply_workflow_inputs(template: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace ``${workflow.<key>}`` step inputs in-place with values from ``inputs``"""
+    for step in template["steps"]:
+        step_inputs = step["inputs"]
+        for key, value in step_inputs.items():
+            if isinstance(value, str):
+                match = _PLACEHOLDER_RE.match(value)
+                if match and match.group(1) in inputs:
+                    step_inputs[key] = inputs[match.group(1)]
+    return template
+
 class WorkflowExamples:
     """Collection of example workflows for testing and demonstration"""
     
@@ -64,15 +78,10 @@ class WorkflowExamples:
         }
         
         # Update template inputs with actual values
-        for step in template["steps"]:
-            for key, value in step["inputs"].items():
-                if isinstance(value, str) and value.startswith("${workflow."):
-                    workflow_key = value[2:-1].split(".")[-1]
-                    if workflow_key in workflow_inputs:
-                        step["inputs"][key] = workflow_inputs[workflow_key]
+        apply_workflow_inputs(template, workflow_inputs)
         
         # Create and execute workflow
-        workflow_id = workflow_engine.create_workflow(
+        workflow_id = get_workflow_engine().create_workflow(
             name=template["name"],
             description=template["description"],
             steps=template["steps"],
@@ -83,7 +92,7 @@ class WorkflowExamples:
         print("Starting workflow execution...")
         
         # Execute workflow
-        result = await workflow_engine.execute_workflow(workflow_id)
+        result = await get_workflow_engine().execute_workflow(workflow_id)
         
         return result
     
@@ -138,14 +147,9 @@ class WorkflowExamples:
         }
         
         # Update template with inputs
-        for step in template["steps"]:
-            for key, value in step["inputs"].items():
-                if isinstance(value, str) and value.startswith("${workflow."):
-                    workflow_key = value[2:-1].split(".")[-1]
-                    if workflow_key in workflow_inputs:
-                        step["inputs"][key] = workflow_inputs[workflow_key]
+        apply_workflow_inputs(template, workflow_inputs)
         
-        workflow_id = workflow_engine.create_workflow(
+        workflow_id = get_workflow_engine().create_workflow(
             name=template["name"],
             description=template["description"],
             steps=template["steps"],
@@ -153,7 +157,7 @@ class WorkflowExamples:
         )
         
         print(f"Created backend API workflow: {workflow_id}")
-        result = await workflow_engine.execute_workflow(workflow_id)
+        result = await get_workflow_engine().execute_workflow(workflow_id)
         
         return result
     
@@ -204,14 +208,9 @@ class WorkflowExamples:
         }
         
         # Update template with inputs
-        for step in template["steps"]:
-            for key, value in step["inputs"].items():
-                if isinstance(value, str) and value.startswith("${workflow."):
-                    workflow_key = value[2:-1].split(".")[-1]
-                    if workflow_key in workflow_inputs:
-                        step["inputs"][key] = workflow_inputs[workflow_key]
+        apply_workflow_inputs(template, workflow_inputs)
         
-        workflow_id = workflow_engine.create_workflow(
+        workflow_id = get_workflow_engine().create_workflow(
             name=template["name"],
             description=template["description"],
             steps=template["steps"],
@@ -219,7 +218,7 @@ class WorkflowExamples:
         )
         
         print(f"Created prototype workflow: {workflow_id}")
-        result = await workflow_engine.execute_workflow(workflow_id)
+        result = await get_workflow_engine().execute_workflow(workflow_id)
         
         return result
     
@@ -319,7 +318,7 @@ class WorkflowExamples:
             ]
         }
         
-        workflow_id = workflow_engine.create_workflow(
+        workflow_id = get_workflow_engine().create_workflow(
             name=validation_workflow["name"],
             description=validation_workflow["description"],
             steps=validation_workflow["steps"],
@@ -327,7 +326,7 @@ class WorkflowExamples:
         )
         
         print(f"Created validation workflow: {workflow_id}")
-        result = await workflow_engine.execute_workflow(workflow_id)
+        result = await get_workflow_engine().execute_workflow(workflow_id)
         
         return result
 
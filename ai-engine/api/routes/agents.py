@@ -2,13 +2,19 @@
 Agent management and orchestration routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
-import uuid
+import asyncio
+import hashlib
+import msgspec
+import orjson
+import time
 
-from ...services.agent_manager import agent_manager, AgentType, TaskStatus
+from ...services.agent_manager import agent_manager, AGENT_TYPE_VALUES, TERMINAL_TASK_STATUSES, agent_snapshot, task_snapshot
 from ...middleware.auth import get_current_user
+from ...core.config import AGENT_CAPABILITIES
 
 router = APIRouter()
 
@@ -24,7 +30,9 @@ class CreateTaskRequest(BaseModel):
     requirements: Dict[str, Any] = Field(default_factory=dict, description="Task requirements")
     dependencies: List[str] = Field(default_factory=list, description="Task dependencies")
 
-class SessionResponse(BaseModel):
+# Response bodies are server-generated, so they are encoded with msgspec
+# rather than re-validated through Pydantic on the way out
+class SessionResponse(msgspec.Struct):
     session_id: str
     status: str
     progress: float
@@ -34,174 +42,268 @@ class SessionResponse(BaseModel):
     tasks: List[Dict[str, Any]]
     updated_at: str
 
-class TaskResponse(BaseModel):
+class TaskResponse(msgspec.Struct):
     task_id: str
     status: str
     result: Optional[Dict[str, Any]]
     error: Optional[str]
     completed_at: Optional[str]
 
-@router.post("/sessions", response_model=Dict[str, str])
+class AgentInfo(msgspec.Struct):
+    agent_id: str
+    name: str
+    type: str
+    status: str
+    current_task: Optional[str]
+    queue_length: int
+    last_active: str
+
+_encoder = msgspec.json.Encoder()
+
+# Status polling cache: live states are reused for a short TTL, finished states never change
+STATUS_CACHE_TTL = 2.0
+STATUS_CACHE_MAX_SIZE = 10_000
+_FINISHED_STATUSES = frozenset({"completed", "failed", "cancelled", "error"})
+_status_cache: Dict[str, Tuple[float, bytes]] = {}
+_finished_status_cache: Dict[str, bytes] = {}
+
+def _remember(cache: Dict[str, Any], key: str, value: Any):
+    """Insert into a bounded cache, evicting the oldest entry when full"""
+    if len(cache) >= STATUS_CACHE_MAX_SIZE and key not in cache:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+def _status_key(kind: str, current_user: dict, *ids: str) -> str:
+    """Cache key scoped to the caller, so one user is never served another user's cached status"""
+    return ":".join((kind, str(current_user["user_id"]), *ids))
+
+async def _cached_status(key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]], model: type) -> Response:
+    """Serve a status body from cache, fetching and encoding it on a miss"""
+    body = _finished_status_cache.get(key)
+    if body is None:
+        entry = _status_cache.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            body = entry[1]
+        else:
+            status = await fetch()
+            body = _encoder.encode(msgspec.convert(status, model))
+            if status.get("status") in _FINISHED_STATUSES:
+                _status_cache.pop(key, None)
+                _remember(_finished_status_cache, key, body)
+            else:
+                _remember(_status_cache, key, (now + STATUS_CACHE_TTL, body))
+    
+    return Response(content=body, media_type="application/json")
+
+# Pre-serialized bodies for the hot enqueue/cancel responses; only the generated id is spliced in
+_ID_PLACEHOLDER = b"__ID__"
+_SESSION_CREATED_TMPL = b'{"session_id":"__ID__"}'
+_SESSION_CANCELLED_BODY = b'{"message":"Session cancelled successfully"}'
+
+def _id_response(template: bytes, identifier: str) -> Response:
+    """Render a pre-serialized template for a server-generated id"""
+    return Response(content=template.replace(_ID_PLACEHOLDER, identifier.encode()), media_type="application/json")
+
+@router.post("/sessions", responses={200: {"model": Dict[str, str]}})
 async def create_session(
     request: CreateSessionRequest,
     current_user: dict = Depends(get_current_user)
-) -> Dict[str, str]:
+) -> Response:
     """Create a new agent session"""
     
-    try:
-        session_id = await agent_manager.create_session(
-            project_id=request.project_id,
-            user_id=current_user["user_id"],
-            session_type=request.session_type,
-            requirements=request.requirements
-        )
-        
-        return {"session_id": session_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create session: {str(e)}")
+    session_id = await agent_manager.create_session(
+        project_id=request.project_id,
+        user_id=current_user["user_id"],
+        session_type=request.session_type,
+        requirements=request.requirements
+    )
+    
+    return _id_response(_SESSION_CREATED_TMPL, session_id)
 
 @router.get("/sessions", response_model=List[str])
 async def list_active_sessions(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of sessions to return"),
+    offset: int = Query(0, ge=0, description="Number of sessions to skip"),
     current_user: dict = Depends(get_current_user)
 ) -> List[str]:
-    """List all active agent sessions"""
+    """List a page of the caller's active agent sessions"""
     
-    try:
-        return await agent_manager.get_active_sessions()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list sessions: {str(e)}")
+    # The store returns only the requested page of the caller's sessions plus the overall count
+    session_ids, total = await agent_manager.get_active_sessions(
+        limit=limit,
+        offset=offset,
+        user_id=current_user["user_id"]
+    )
+    
+    response.headers["X-Total-Count"] = str(total)
+    return session_ids
+
+@router.get("/agents", responses={200: {"model": List[Dict[str, Any]]}})
+async def list_agents(
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """List registered agents, streamed as a JSON array one agent at a time"""
+    
+    async def generate_agents():
+        separator = b"["
+        async for agent in agent_manager.iter_agents():
+            yield separator + _encoder.encode(AgentInfo(**agent_snapshot(agent)))
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    
+    return StreamingResponse(generate_agents(), media_type="application/json")
 
-@router.get("/sessions/{session_id}", response_model=SessionResponse)
+@router.get("/sessions/{session_id}")
 async def get_session_status(
     session_id: str,
     current_user: dict = Depends(get_current_user)
-) -> SessionResponse:
+) -> Response:
     """Get status of a specific session"""
     
     try:
-        status = await agent_manager.get_session_status(session_id)
-        return SessionResponse(**status)
+        return await _cached_status(
+            _status_key("session", current_user, session_id),
+            lambda: agent_manager.get_session_status(session_id, user_id=current_user["user_id"]),
+            SessionResponse
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get session status: {str(e)}")
 
-@router.delete("/sessions/{session_id}")
+@router.delete("/sessions/{session_id}", responses={200: {"model": Dict[str, str]}})
 async def cancel_session(
     session_id: str,
     current_user: dict = Depends(get_current_user)
-) -> Dict[str, str]:
+) -> Response:
     """Cancel an active session"""
     
     try:
-        await agent_manager.cancel_session(session_id)
-        return {"message": "Session cancelled successfully"}
+        await agent_manager.cancel_session(session_id, user_id=current_user["user_id"])
+        # A body cached before the cancel, live or finished, no longer reflects the session
+        key = _status_key("session", current_user, session_id)
+        _status_cache.pop(key, None)
+        _finished_status_cache.pop(key, None)
+        return Response(content=_SESSION_CANCELLED_BODY, media_type="application/json")
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to cancel session: {str(e)}")
 
-@router.get("/sessions/{session_id}/tasks/{task_id}", response_model=TaskResponse)
+@router.get("/sessions/{session_id}/tasks/{task_id}")
 async def get_task_result(
     session_id: str,
     task_id: str,
     current_user: dict = Depends(get_current_user)
-) -> TaskResponse:
+) -> Response:
     """Get result of a specific task"""
     
     try:
-        result = await agent_manager.get_task_result(session_id, task_id)
-        return TaskResponse(**result)
+        return await _cached_status(
+            _status_key("task", current_user, session_id, task_id),
+            lambda: agent_manager.get_task_result(session_id, task_id, user_id=current_user["user_id"]),
+            TaskResponse
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get task result: {str(e)}")
 
-@router.get("/types")
-async def get_agent_types() -> Dict[str, List[str]]:
-    """Get available agent types and their capabilities"""
-    
-    from ...core.config import AGENT_CAPABILITIES
-    
-    return {
-        "agent_types": [agent_type.value for agent_type in AgentType],
-        "capabilities": AGENT_CAPABILITIES
-    }
+# Seconds between result-backend checks for tasks running on the worker queue
+QUEUED_TASK_POLL_INTERVAL = 2.0
 
-@router.get("/status")
-async def get_agent_manager_status(
+@router.get("/tasks/{task_id}/stream")
+async def stream_task_progress(
+    task_id: str,
     current_user: dict = Depends(get_current_user)
-) -> Dict[str, Any]:
-    """Get overall agent manager status"""
+) -> StreamingResponse:
+    """Stream task status updates as server-sent events until the task finishes"""
     
     try:
-        return await agent_manager.health_check()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get agent status: {str(e)}")
-
-# Project generation workflow endpoints
-@router.post("/generate/project")
-async def generate_project(
-    request: CreateSessionRequest,
-    current_user: dict = Depends(get_current_user)
-) -> Dict[str, str]:
-    """Start a project generation workflow"""
+        task = await agent_manager.get_user_task(task_id, user_id=current_user["user_id"])
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
-    # Set session type to project_generation
-    request.session_type = "project_generation"
+    # In-process tasks push every transition; queued tasks live in the worker pool
+    poll_interval = QUEUED_TASK_POLL_INTERVAL if task.metadata.get("queued") else None
     
-    try:
-        session_id = await agent_manager.create_session(
-            project_id=request.project_id,
-            user_id=current_user["user_id"],
-            session_type=request.session_type,
-            requirements=request.requirements
-        )
-        
-        return {"session_id": session_id, "message": "Project generation started"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to start project generation: {str(e)}")
+    async def generate_progress_stream():
+        updates = agent_manager.subscribe_task(task_id)
+        try:
+            status = task_snapshot(task)
+            yield b"data: " + orjson.dumps(status) + b"\n\n"
+            
+            while status["status"] not in TERMINAL_TASK_STATUSES:
+                try:
+                    status = await asyncio.wait_for(updates.get(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    # A refresh that observes a new state publishes it to `updates`
+                    await agent_manager.get_task_status(task_id)
+                    continue
+                yield b"data: " + orjson.dumps(status) + b"\n\n"
+        finally:
+            agent_manager.unsubscribe_task(task_id, updates)
+    
+    return StreamingResponse(generate_progress_stream(), media_type="text/event-stream")
 
-@router.post("/review/code")
-async def review_code(
-    request: CreateSessionRequest,
-    current_user: dict = Depends(get_current_user)
-) -> Dict[str, str]:
-    """Start a code review workflow"""
+# The agent types payload is static, so it is serialized and hashed once at import
+_AGENT_TYPES_BODY = orjson.dumps({
+    "agent_types": AGENT_TYPE_VALUES,
+    "capabilities": AGENT_CAPABILITIES
+})
+_AGENT_TYPES_ETAG = '"' + hashlib.blake2b(_AGENT_TYPES_BODY, digest_size=16).hexdigest() + '"'
+
+_STATIC_CACHE_CONTROL = "public, max-age=300"
+
+@router.get("/types")
+async def get_agent_types(request: Request) -> Response:
+    """Get available agent types and their capabilities"""
     
-    # Set session type to code_review
-    request.session_type = "code_review"
+    etag = _AGENT_TYPES_ETAG
+    headers = {"ETag": etag, "Cache-Control": _STATIC_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    try:
-        session_id = await agent_manager.create_session(
-            project_id=request.project_id,
-            user_id=current_user["user_id"],
-            session_type=request.session_type,
-            requirements=request.requirements
-        )
-        
-        return {"session_id": session_id, "message": "Code review started"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to start code review: {str(e)}")
+    return Response(content=_AGENT_TYPES_BODY, media_type="application/json", headers=headers)
 
-@router.post("/debug/assistance")
-async def debug_assistance(
-    request: CreateSessionRequest,
+@router.get("/status", responses={200: {"model": Dict[str, Any]}})
+async def get_agent_manager_status(
     current_user: dict = Depends(get_current_user)
-) -> Dict[str, str]:
-    """Start a debugging assistance workflow"""
+) -> Response:
+    """Get overall agent manager status from the periodically refreshed snapshot"""
+    
+    body = agent_manager.status_snapshot or await agent_manager.refresh_status_snapshot()
+    return Response(content=body, media_type="application/json")
+
+# Workflow starter endpoints: (path, session type, workflow label)
+_WORKFLOW_ROUTES = (
+    ("/generate/project", "project_generation", "project generation"),
+    ("/review/code", "code_review", "code review"),
+    ("/debug/assistance", "debugging", "debugging assistance"),
+)
+
+def _workflow_starter(session_type: str, label: str):
+    """Build a handler that starts a session of a fixed type"""
     
-    # Set session type to debugging
-    request.session_type = "debugging"
+    started_template = orjson.dumps({"session_id": "__ID__", "message": f"{label.capitalize()} started"})
     
-    try:
+    async def start_workflow(
+        request: CreateSessionRequest,
+        current_user: dict = Depends(get_current_user)
+    ) -> Response:
         session_id = await agent_manager.create_session(
             project_id=request.project_id,
             user_id=current_user["user_id"],
-            session_type=request.session_type,
+            session_type=session_type,
             requirements=request.requirements
         )
         
-        return {"session_id": session_id, "message": "Debugging assistance started"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to start debugging assistance: {str(e)}")
\ No newline at end of file
+        return _id_response(started_template, session_id)
+    
+    return start_workflow
+
+for path, session_type, label in _WORKFLOW_ROUTES:
+    router.add_api_route(
+        path,
+        _workflow_starter(session_type, label),
+        methods=["POST"],
+        responses={200: {"model": Dict[str, str]}},
+        name=f"start_{session_type}",
+        summary=f"Start a {label} workflow"
+    )
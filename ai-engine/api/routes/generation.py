@@ -3,96 +3,392 @@ Text and code generation routes with hardening: validation, timeouts, retries, p
 """
 
 import asyncio
+import hashlib
 import time
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
-from typing import Dict, List, Any, Optional, AsyncGenerator
-from pydantic import BaseModel, Field, validator
-import json
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Annotated, Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type, TypeVar
+import msgspec
+import orjson
 
-from ...services.llm_manager import llm_manager, LLMProvider
+from ...services.llm_manager import llm_manager, LLMProvider, LLMResponse
+from ...services.cache_manager import cache_manager
 from ...middleware.auth import get_current_user
 from ...core.config import settings
+from ...core.exceptions import RateLimitError
+
+try:
+    from openai import RateLimitError as OpenAIRateLimitError
+except ImportError:
+    OpenAIRateLimitError = None
+
+try:
+    from anthropic import RateLimitError as AnthropicRateLimitError
+except ImportError:
+    AnthropicRateLimitError = None
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:
+    ResourceExhausted = None
+
+try:
+    from ...services.metrics import metrics_collector
+except ImportError:
+    metrics_collector = None
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Request validation models
-class GenerationRequest(BaseModel):
-    prompt: str = Field(..., min_length=1, max_length=50000, description="The prompt to generate from")
-    context: Optional[str] = Field(None, max_length=20000, description="Additional context")
-    provider: Optional[str] = Field(None, description="LLM provider to use")
-    model: Optional[str] = Field(None, description="Specific model to use")
-    max_tokens: Optional[int] = Field(None, ge=1, le=8192, description="Maximum tokens to generate")
-    temperature: Optional[float] = Field(None, ge=0.0, le=2.0, description="Sampling temperature")
-    stream: bool = Field(False, description="Stream the response")
-    
-    @validator('prompt')
-    def validate_prompt(cls, v):
-        if not v or not v.strip():
+# Resolved once at import: provider lookup by value and the generation defaults
+_PROVIDER_MAP: Dict[str, LLMProvider] = {p.value: p for p in LLMProvider}
+_MAX_TOKENS = settings.MAX_TOKENS
+_DEFAULT_TEMPERATURE = settings.DEFAULT_TEMPERATURE
+
+# Request validation models, decoded and validated by msgspec in a single pass
+class GenerationRequest(msgspec.Struct):
+    prompt: Annotated[str, msgspec.Meta(min_length=1, max_length=50000, description="The prompt to generate from")]
+    context: Optional[Annotated[str, msgspec.Meta(max_length=20000, description="Additional context")]] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    max_tokens: Optional[Annotated[int, msgspec.Meta(ge=1, le=8192, description="Maximum tokens to generate")]] = None
+    temperature: Optional[Annotated[float, msgspec.Meta(ge=0.0, le=2.0, description="Sampling temperature")]] = None
+    stream: bool = False
+    
+    def __post_init__(self):
+        self.prompt = self.prompt.strip()
+        if not self.prompt:
             raise ValueError('Prompt cannot be empty or whitespace only')
-        return v.strip()
-
-class CodeGenerationRequest(BaseModel):
-    description: str = Field(..., min_length=1, max_length=10000, description="Description of the code to generate")
-    language: str = Field(..., min_length=1, max_length=50, description="Programming language")
-    framework: Optional[str] = Field(None, max_length=100, description="Framework to use")
-    features: Optional[List[str]] = Field(None, description="Features to include")
-    style_guide: Optional[str] = Field(None, max_length=1000, description="Code style guide to follow")
-    
-    @validator('features')
-    def validate_features(cls, v):
-        if v and len(v) > 20:
-            raise ValueError('Too many features specified (max 20)')
-        return v
-
-class CodeExplanationRequest(BaseModel):
-    code: str = Field(..., min_length=1, max_length=50000, description="Code to explain")
-    language: str = Field(..., min_length=1, max_length=50, description="Programming language")
-    focus: Optional[str] = Field(None, max_length=500, description="Specific aspect to focus on")
-
-class DebugRequest(BaseModel):
-    code: str = Field(..., min_length=1, max_length=50000, description="Code to debug")
-    error: Optional[str] = Field(None, max_length=10000, description="Error message")
-    language: str = Field("javascript", min_length=1, max_length=50, description="Programming language")
-    context: Optional[str] = Field(None, max_length=5000, description="Additional context")
-
-class ChatRequest(BaseModel):
-    messages: List[Dict[str, str]] = Field(..., description="Chat messages")
-    model: Optional[str] = Field(None, description="Model to use")
-    temperature: Optional[float] = Field(0.7, ge=0.0, le=2.0, description="Temperature")
-    
-    @validator('messages')
-    def validate_messages(cls, v):
-        if not v:
-            raise ValueError('Messages cannot be empty')
-        if len(v) > 100:
-            raise ValueError('Too many messages in conversation (max 100)')
-        
-        for msg in v:
-            if not isinstance(msg, dict) or 'role' not in msg or 'content' not in msg:
-                raise ValueError('Each message must have role and content')
-            if msg['role'] not in ['user', 'assistant', 'system']:
-                raise ValueError('Invalid message role')
-            if not msg['content'] or len(msg['content']) > 20000:
-                raise ValueError('Message content invalid or too long')
-        
-        return v
+
+class CodeGenerationRequest(msgspec.Struct):
+    description: Annotated[str, msgspec.Meta(min_length=1, max_length=10000, description="Description of the code to generate")]
+    language: Annotated[str, msgspec.Meta(min_length=1, max_length=50, description="Programming language")]
+    framework: Optional[Annotated[str, msgspec.Meta(max_length=100, description="Framework to use")]] = None
+    features: Optional[Annotated[List[str], msgspec.Meta(max_length=20, description="Features to include (max 20)")]] = None
+    style_guide: Optional[Annotated[str, msgspec.Meta(max_length=1000, description="Code style guide to follow")]] = None
+
+class CodeExplanationRequest(msgspec.Struct):
+    code: Annotated[str, msgspec.Meta(min_length=1, max_length=50000, description="Code to explain")]
+    language: Annotated[str, msgspec.Meta(min_length=1, max_length=50, description="Programming language")]
+    focus: Optional[Annotated[str, msgspec.Meta(max_length=500, description="Specific aspect to focus on")]] = None
+
+class DebugRequest(msgspec.Struct):
+    code: Annotated[str, msgspec.Meta(min_length=1, max_length=50000, description="Code to debug")]
+    error: Optional[Annotated[str, msgspec.Meta(max_length=10000, description="Error message")]] = None
+    language: Annotated[str, msgspec.Meta(min_length=1, max_length=50, description="Programming language")] = "javascript"
+    context: Optional[Annotated[str, msgspec.Meta(max_length=5000, description="Additional context")]] = None
+
+class ChatMessage(msgspec.Struct):
+    role: Literal["user", "assistant", "system"]
+    content: Annotated[str, msgspec.Meta(min_length=1, max_length=20000)]
+
+class ChatRequest(msgspec.Struct):
+    messages: Annotated[List[ChatMessage], msgspec.Meta(min_length=1, max_length=100, description="Chat messages (max 100)")]
+    model: Optional[str] = None
+    temperature: Optional[Annotated[float, msgspec.Meta(ge=0.0, le=2.0, description="Temperature")]] = 0.7
+    stream: bool = False
 
 # Response models
-class GenerationResponse(BaseModel):
+class GenerationResponse(msgspec.Struct):
     content: str
     usage: Dict[str, int]
     model: str
     provider: str
     timestamp: float
 
-class ErrorResponse(BaseModel):
+class ErrorResponse(msgspec.Struct):
     error: str
     code: str
     timestamp: float
 
+_encoder = msgspec.json.Encoder()
+
+T = TypeVar("T")
+
+def msgspec_body(model: Type[T]) -> Callable:
+    """Dependency that decodes and validates the JSON request body as `model`"""
+    decoder = msgspec.json.Decoder(model)
+    
+    async def decode_body(request: Request) -> T:
+        try:
+            return decoder.decode(await request.body())
+        except msgspec.ValidationError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except msgspec.DecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed JSON body: {e}")
+    
+    return decode_body
+
+def _inline_schema(model: type) -> Dict[str, Any]:
+    """JSON schema for a Struct with its local $refs inlined, usable anywhere in the OpenAPI document"""
+    schema = msgspec.json.schema(model)
+    defs = schema.pop("$defs", {})
+    
+    def resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if ref is not None:
+                return resolve(defs[ref.rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(item) for item in node]
+        return node
+    
+    return resolve(schema)
+
+def _openapi_body(model: type) -> Dict[str, Any]:
+    """OpenAPI request body for a msgspec-decoded route, since FastAPI cannot introspect Structs"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_schema(model)}}
+        }
+    }
+
+_GENERATION_RESPONSES = {
+    200: {"content": {"application/json": {"schema": _inline_schema(GenerationResponse)}}}
+}
+
+# Per-thread scratch buffer: encode_into reuses its capacity instead of growing a fresh buffer per response
+_encode_buffers = threading.local()
+
+def _encode(value: Any) -> bytes:
+    """Encode a response Struct through the reused scratch buffer"""
+    buf = getattr(_encode_buffers, "buf", None)
+    if buf is None:
+        buf = _encode_buffers.buf = bytearray()
+    _encoder.encode_into(value, buf)
+    return bytes(buf)
+
+def _json_response(value: Any) -> Response:
+    """Encode a response Struct without revalidating it"""
+    return Response(content=_encode(value), media_type="application/json")
+
+# Stream coalescing: the first frame goes out after a single chunk for a fast first token,
+# then batches grow geometrically toward larger, cheaper frames
+DEFAULT_MIN_BATCH_SIZE = 1
+DEFAULT_MAX_BATCH_SIZE = 50
+DEFAULT_BATCH_SIZE_GROWTH_FACTOR = 3
+STREAM_FLUSH_INTERVAL = 0.05
+# Batches repeated in each frame's `tail`
+STREAM_TAIL_BATCHES = 3
+
+# Streaming deadlines: time to first token, gap between tokens, and a wall-clock cap
+FIRST_TOKEN_TIMEOUT = 30.0
+INTER_TOKEN_TIMEOUT = 5.0
+STREAM_TOTAL_TIMEOUT = 120.0
+
+async def _guarded_stream(
+    stream: AsyncGenerator[str, None],
+    first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
+    token_timeout: float = INTER_TOKEN_TIMEOUT,
+    total_timeout: float = STREAM_TOTAL_TIMEOUT
+) -> AsyncGenerator[str, None]:
+    """Enforce per-token deadlines on a provider stream, raising TimeoutError when one is missed"""
+    
+    loop = asyncio.get_running_loop()
+    stream_deadline = loop.time() + total_timeout
+    timeout = first_token_timeout
+    
+    try:
+        while True:
+            try:
+                async with asyncio.timeout_at(min(loop.time() + timeout, stream_deadline)):
+                    chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            yield chunk
+            timeout = token_timeout
+    finally:
+        # Release the upstream provider connection even when the client disconnects
+        await stream.aclose()
+
+# Fixed SSE frames are encoded once
+_DONE_FRAME = b'data: {"done":true}\n\n'
+_TIMEOUT_FRAME = b'data: {"error":"Stream timeout"}\n\n'
+_STREAM_FAILED_FRAME = b'data: {"error":"Streaming failed"}\n\n'
+
+# Proxies (X-Accel-Buffering for nginx) and compression middleware must not buffer token frames
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    "Content-Encoding": "identity",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*"
+}
+
+def _sse_frame(payload: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+async def _whole_sse_events(stream: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
+    """Re-chunk raw SSE bytes on event boundaries, so a failure never leaves a half-sent event"""
+    pending = b""
+    try:
+        async for chunk in stream:
+            pending += chunk
+            boundary = pending.rfind(b"\n\n") + 2
+            if boundary > 1:
+                yield pending[:boundary]
+                pending = pending[boundary:]
+        # Upstream ended cleanly: whatever is left is its final (possibly unterminated) event
+        if pending:
+            yield pending
+    finally:
+        await stream.aclose()
+
+async def _batched_stream(
+    stream: AsyncIterator[str],
+    min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    flush_interval: float = STREAM_FLUSH_INTERVAL
+) -> AsyncGenerator[str, None]:
+    """Coalesce stream chunks, flushing every `batch_size` chunks or `flush_interval` seconds"""
+    
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    batch_size = min_batch_size
+    buffer: List[str] = []
+    deadline: Optional[float] = None
+    # The in-flight read survives a flush so a timed-out wait never cancels the upstream stream
+    pending: Optional[asyncio.Future] = None
+    
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            
+            timeout = None if deadline is None else max(deadline - loop.time(), 0.0)
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            
+            if done:
+                read, pending = pending, None
+                try:
+                    buffer.append(read.result())
+                except StopAsyncIteration:
+                    break
+                if deadline is None:
+                    deadline = loop.time() + flush_interval
+                if len(buffer) < batch_size:
+                    continue
+            
+            yield "".join(buffer)
+            buffer.clear()
+            deadline = None
+            batch_size = min(batch_size * DEFAULT_BATCH_SIZE_GROWTH_FACTOR, max_batch_size)
+        
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+# Rate-limit and quota errors: retrying the same provider only burns the backoff budget
+_NON_RETRYABLE_ERRORS = tuple(
+    error for error in (RateLimitError, OpenAIRateLimitError, AnthropicRateLimitError, ResourceExhausted, HTTPException)
+    if error is not None
+)
+
+# Failover order, filtered once to the providers configured at startup
+_DEFAULT_PROVIDER_CHAIN = tuple(
+    p for p in (LLMProvider.OPENAI, LLMProvider.ANTHROPIC, LLMProvider.GOOGLE, LLMProvider.LOCAL)
+    if p in llm_manager.providers
+)
+
+# Circuit breaker: after repeated consecutive failures a provider is skipped for a cool-down period
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_SECONDS = 30.0
+_provider_failures: Dict[LLMProvider, int] = {}
+_provider_open_until: Dict[LLMProvider, float] = {}
+
+def _circuit_open(provider: LLMProvider) -> bool:
+    return _provider_open_until.get(provider, 0.0) > time.monotonic()
+
+def _record_failure(provider: LLMProvider):
+    failures = _provider_failures.get(provider, 0) + 1
+    if failures >= CIRCUIT_FAILURE_THRESHOLD:
+        _provider_open_until[provider] = time.monotonic() + CIRCUIT_OPEN_SECONDS
+        failures = 0
+        logger.warning("Circuit opened for %s for %ss", provider.value, CIRCUIT_OPEN_SECONDS)
+    _provider_failures[provider] = failures
+
+def _record_success(provider: LLMProvider):
+    _provider_failures.pop(provider, None)
+
+# Admission control: at most MAX_INFLIGHT_GENERATIONS LLM calls run at once; the rest wait briefly,
+# then fail fast with 503 instead of piling unbounded tasks onto the event loop
+MAX_INFLIGHT_GENERATIONS = settings.MAX_CONCURRENT_REQUESTS
+ADMISSION_TIMEOUT = settings.ADMISSION_TIMEOUT
+ADMISSION_RETRY_AFTER_SECONDS = "1"
+_inflight = asyncio.Semaphore(MAX_INFLIGHT_GENERATIONS)
+_inflight_count = 0
+
+def _report_admission():
+    if metrics_collector is not None:
+        metrics_collector.update_admission(_inflight_count)
+
+async def _acquire_slot():
+    """Take an in-flight slot, raising 503 when none frees up within the admission timeout"""
+    global _inflight_count
+    try:
+        async with asyncio.timeout(ADMISSION_TIMEOUT):
+            await _inflight.acquire()
+    except asyncio.TimeoutError:
+        if metrics_collector is not None:
+            metrics_collector.record_admission_rejection()
+        raise HTTPException(status_code=503, detail="overloaded", headers={"Retry-After": ADMISSION_RETRY_AFTER_SECONDS})
+    _inflight_count += 1
+    _report_admission()
+
+def _release_slot():
+    global _inflight_count
+    _inflight_count -= 1
+    _inflight.release()
+    _report_admission()
+
+@asynccontextmanager
+async def _admitted():
+    """Hold an in-flight slot for the duration of a non-streaming LLM call"""
+    await _acquire_slot()
+    try:
+        yield
+    finally:
+        _release_slot()
+
+class _StreamSlot:
+    """In-flight slot owned by a streaming response, released exactly once"""
+    
+    __slots__ = ("held",)
+    
+    def __init__(self):
+        self.held = True
+    
+    def release(self):
+        if self.held:
+            self.held = False
+            _release_slot()
+
+async def _admitted_stream(body: Callable[[], AsyncIterator[bytes]]) -> StreamingResponse:
+    """Admit a streaming response; its slot is freed when the stream ends or the client disconnects"""
+    await _acquire_slot()
+    slot = _StreamSlot()
+    
+    async def stream() -> AsyncGenerator[bytes, None]:
+        try:
+            async for chunk in body():
+                yield chunk
+        finally:
+            slot.release()
+    
+    # The background task covers a client that disconnects before the body is ever iterated
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_SSE_HEADERS, background=BackgroundTask(slot.release))
+
 # Hardened generation with retries and failover
 async def hardened_generate(
     prompt: str,
@@ -107,19 +403,22 @@ async def hardened_generate(
     base_delay = 1.0
     timeout_seconds = 30.0
     
-    providers_to_try = [provider] if provider else [
-        LLMProvider.OPENAI,
-        LLMProvider.ANTHROPIC, 
-        LLMProvider.GOOGLE,
-        LLMProvider.LOCAL  # Fallback
-    ]
+    if provider is None:
+        providers_to_try = _DEFAULT_PROVIDER_CHAIN
+    elif provider in llm_manager.providers:
+        providers_to_try = (provider,)
+    else:
+        providers_to_try = ()
     
     last_error = None
+    # One clock read per request; the response is stamped with the request's start time
+    started_at = time.time()
     
     for provider_attempt in providers_to_try:
-        if provider_attempt not in llm_manager.providers:
+        if _circuit_open(provider_attempt):
+            last_error = f"Circuit open for {provider_attempt.value}"
             continue
-            
+        
         for retry in range(max_retries):
             try:
                 # Apply timeout
@@ -133,26 +432,33 @@ async def hardened_generate(
                     timeout=timeout_seconds
                 )
                 
+                _record_success(provider_attempt)
                 return GenerationResponse(
                     content=response.content,
                     usage=response.usage,
                     model=response.model,
                     provider=response.metadata.get("provider", "unknown"),
-                    timestamp=time.time()
+                    timestamp=started_at
                 )
                 
             except asyncio.TimeoutError as e:
                 last_error = f"Timeout after {timeout_seconds}s with {provider_attempt.value}"
-                logger.warning(f"Generation timeout (attempt {retry + 1}): {last_error}")
+                logger.warning("Generation timeout (attempt %d): %s", retry + 1, last_error)
+                _record_failure(provider_attempt)
                 
             except Exception as e:
                 last_error = f"Error with {provider_attempt.value}: {str(e)}"
-                logger.warning(f"Generation error (attempt {retry + 1}): {last_error}")
+                logger.warning("Generation error (attempt %d): %s", retry + 1, last_error)
+                _record_failure(provider_attempt)
                 
                 # Don't retry on certain errors
-                if "rate limit" in str(e).lower() or "quota" in str(e).lower():
+                if isinstance(e, _NON_RETRYABLE_ERRORS):
                     break
             
+            # Stop retrying a provider whose circuit just opened
+            if _circuit_open(provider_attempt):
+                break
+            
             # Exponential backoff
             if retry < max_retries - 1:
                 await asyncio.sleep(base_delay * (2 ** retry))
@@ -163,101 +469,165 @@ async def hardened_generate(
         detail=f"All generation attempts failed. Last error: {last_error}"
     )
 
-@router.post("/generation", response_model=GenerationResponse)
+@router.post("/generation", responses=_GENERATION_RESPONSES, openapi_extra=_openapi_body(GenerationRequest))
 async def generate_text(
-    request: GenerationRequest,
     req: Request,
+    request: GenerationRequest = Depends(msgspec_body(GenerationRequest)),
     current_user: dict = Depends(get_current_user)
-) -> GenerationResponse:
+) -> Response:
     """Generate text with full hardening"""
     
-    logger.info(f"Generation request from user {current_user.get('id', 'unknown')}")
+    logger.info("Generation request from user %s", current_user.get('id', 'unknown'))
     
     try:
-        provider_enum = None
-        if request.provider:
-            try:
-                provider_enum = LLMProvider(request.provider)
-            except ValueError:
-                raise HTTPException(status_code=400, detail=f"Invalid provider: {request.provider}")
+        provider_enum = _PROVIDER_MAP.get(request.provider) if request.provider else None
+        if request.provider and provider_enum is None:
+            raise HTTPException(status_code=400, detail=f"Invalid provider: {request.provider}")
         
-        return await hardened_generate(
-            prompt=request.prompt,
-            context=request.context,
-            provider=provider_enum,
-            model=request.model,
-            max_tokens=request.max_tokens or settings.MAX_TOKENS,
-            temperature=request.temperature or settings.DEFAULT_TEMPERATURE
-        )
+        # Only greedy decoding is repeatable enough to serve from cache
+        cache_key = _response_cache_key("Generation", request) if request.temperature == 0.0 else None
+        if cache_key is not None:
+            body = await _get_cached_response(cache_key)
+            if body is not None:
+                return _cache_hit(body)
+        
+        async with _admitted():
+            result = await hardened_generate(
+                prompt=request.prompt,
+                context=request.context,
+                provider=provider_enum,
+                model=request.model,
+                max_tokens=request.max_tokens or _MAX_TOKENS,
+                temperature=_DEFAULT_TEMPERATURE if request.temperature is None else request.temperature
+            )
+        
+        if cache_key is None:
+            return _json_response(result)
+        return _cache_miss(await _cache_response(cache_key, result))
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected generation error: {str(e)}", exc_info=True)
+        logger.error("Unexpected generation error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal generation error")
 
-@router.post("/chat")
+# Prompt prefixes for the roles ChatMessage allows
+_ROLE_PREFIX = {"user": "User: ", "assistant": "Assistant: ", "system": "System: "}
+
+# OpenAI chat.completion body; only the variable fields are JSON-encoded per call
+_CHAT_COMPLETION_TMPL = (
+    b'{"id":"chatcmpl-%d","object":"chat.completion","created":%d,"model":%b,'
+    b'"choices":[{"index":0,"message":{"role":"assistant","content":%b},"finish_reason":"stop"}],'
+    b'"usage":%b}'
+)
+
+# OpenAI chat.completion.chunk frames for streamed chat
+_CHAT_CHUNK_TMPL = (
+    b'data: {"id":"chatcmpl-%d","object":"chat.completion.chunk","created":%d,"model":%b,'
+    b'"choices":[{"index":0,"delta":{"content":%b},"finish_reason":null}]}\n\n'
+)
+_CHAT_FINAL_CHUNK_TMPL = (
+    b'data: {"id":"chatcmpl-%d","object":"chat.completion.chunk","created":%d,"model":%b,'
+    b'"choices":[{"index":0,"delta":{},"finish_reason":"stop"}]}\n\n'
+)
+_CHAT_DONE_FRAME = b"data: [DONE]\n\n"
+
+async def _stream_chat_completion(prompt: str, request: ChatRequest) -> StreamingResponse:
+    """Stream a chat completion as OpenAI-style delta chunks, passing provider SSE through when compatible"""
+    
+    created = int(time.time())
+    model = orjson.dumps(request.model or llm_manager.configs[llm_manager.default_provider].model)
+    
+    async def generate_chunks() -> AsyncGenerator[bytes, None]:
+        temperature = _DEFAULT_TEMPERATURE if request.temperature is None else request.temperature
+        
+        if llm_manager.supports_raw_stream():
+            # The provider already emits chat.completion.chunk SSE: forward its events untouched
+            try:
+                raw_stream = _guarded_stream(llm_manager.generate_stream_raw(prompt=prompt, temperature=temperature))
+                async for chunk in _whole_sse_events(raw_stream):
+                    yield chunk
+            except asyncio.TimeoutError:
+                yield _TIMEOUT_FRAME
+                yield _CHAT_DONE_FRAME
+            except Exception as e:
+                logger.error("Chat streaming error: %s", e, exc_info=True)
+                yield _STREAM_FAILED_FRAME
+                yield _CHAT_DONE_FRAME
+            return
+        
+        try:
+            stream_gen = llm_manager.generate_stream(
+                prompt=prompt,
+                temperature=temperature
+            )
+            async for batch in _batched_stream(_guarded_stream(stream_gen)):
+                yield _CHAT_CHUNK_TMPL % (created, created, model, orjson.dumps(batch))
+            yield _CHAT_FINAL_CHUNK_TMPL % (created, created, model)
+        except asyncio.TimeoutError:
+            yield _TIMEOUT_FRAME
+        except Exception as e:
+            logger.error("Chat streaming error: %s", e, exc_info=True)
+            yield _STREAM_FAILED_FRAME
+        yield _CHAT_DONE_FRAME
+    
+    return await _admitted_stream(generate_chunks)
+
+@router.post("/chat", openapi_extra=_openapi_body(ChatRequest))
 async def chat_completion(
-    request: ChatRequest,
+    request: ChatRequest = Depends(msgspec_body(ChatRequest)),
     current_user: dict = Depends(get_current_user)
-):
+) -> Response:
     """OpenAI-compatible chat completion with hardening"""
     
     try:
         # Build prompt from messages
-        prompt_parts = []
-        for msg in request.messages:
-            role = msg['role'].title()
-            content = msg['content']
-            prompt_parts.append(f"{role}: {content}")
+        full_prompt = "\n\n".join([_ROLE_PREFIX[msg.role] + msg.content for msg in request.messages]) + "\n\nAssistant:"
         
-        full_prompt = "\n\n".join(prompt_parts) + "\n\nAssistant:"
+        if request.stream:
+            return await _stream_chat_completion(full_prompt, request)
         
-        response = await hardened_generate(
-            prompt=full_prompt,
-            model=request.model,
-            temperature=request.temperature
-        )
+        async with _admitted():
+            response = await hardened_generate(
+                prompt=full_prompt,
+                model=request.model,
+                temperature=request.temperature
+            )
         
         # Return in OpenAI format
-        return {
-            "id": f"chatcmpl-{int(time.time())}",
-            "object": "chat.completion",
-            "created": int(time.time()),
-            "model": response.model,
-            "choices": [{
-                "index": 0,
-                "message": {
-                    "role": "assistant",
-                    "content": response.content
-                },
-                "finish_reason": "stop"
-            }],
-            "usage": response.usage
-        }
+        created = int(time.time())
+        return Response(
+            content=_CHAT_COMPLETION_TMPL % (
+                created,
+                created,
+                orjson.dumps(response.model),
+                orjson.dumps(response.content),
+                orjson.dumps(response.usage)
+            ),
+            media_type="application/json"
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Chat completion error: {str(e)}", exc_info=True)
+        logger.error("Chat completion error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Chat completion failed")
 
-@router.post("/generation/stream")
+@router.post("/generation/stream", openapi_extra=_openapi_body(GenerationRequest))
 async def stream_text_generation(
-    request: GenerationRequest,
+    request: GenerationRequest = Depends(msgspec_body(GenerationRequest)),
+    min_batch_size: int = Query(DEFAULT_MIN_BATCH_SIZE, ge=1, le=DEFAULT_MAX_BATCH_SIZE, description="Chunks in the first streamed frame"),
+    max_batch_size: int = Query(DEFAULT_MAX_BATCH_SIZE, ge=1, le=DEFAULT_MAX_BATCH_SIZE, description="Upper bound on chunks per streamed frame"),
     current_user: dict = Depends(get_current_user)
 ):
     """Stream text generation with hardening"""
     
-    async def generate_stream() -> AsyncGenerator[str, None]:
+    async def generate_stream() -> AsyncGenerator[bytes, None]:
         try:
-            provider_enum = None
-            if request.provider:
-                try:
-                    provider_enum = LLMProvider(request.provider)
-                except ValueError:
-                    yield f"data: {json.dumps({'error': f'Invalid provider: {request.provider}'})}\n\n"
-                    return
+            provider_enum = _PROVIDER_MAP.get(request.provider) if request.provider else None
+            if request.provider and provider_enum is None:
+                yield _sse_frame({"error": f"Invalid provider: {request.provider}"})
+                return
             
             # Apply timeout to streaming
             try:
@@ -265,156 +635,185 @@ async def stream_text_generation(
                     prompt=request.prompt,
                     context=request.context,
                     provider=provider_enum,
-                    max_tokens=request.max_tokens or settings.MAX_TOKENS,
-                    temperature=request.temperature or settings.DEFAULT_TEMPERATURE
+                    max_tokens=request.max_tokens or _MAX_TOKENS,
+                    temperature=_DEFAULT_TEMPERATURE if request.temperature is None else request.temperature
                 )
                 
-                async for chunk in asyncio.wait_for(stream_gen, timeout=60.0):
-                    yield f"data: {json.dumps({'content': chunk, 'timestamp': time.time()})}\n\n"
+                # Each frame repeats the last few batches so clients can render past a lost frame, deduping on seq
+                recent = deque(maxlen=STREAM_TAIL_BATCHES)
+                seq = 0
+                async for batch in _batched_stream(_guarded_stream(stream_gen), min_batch_size, max(min_batch_size, max_batch_size)):
+                    recent.append(batch)
+                    yield _sse_frame({"seq": seq, "content": batch, "tail": "".join(recent), "timestamp": time.time()})
+                    seq += 1
                 
-                yield f"data: {json.dumps({'done': True})}\n\n"
+                yield _DONE_FRAME
                 
             except asyncio.TimeoutError:
-                yield f"data: {json.dumps({'error': 'Stream timeout'})}\n\n"
+                yield _TIMEOUT_FRAME
             
         except Exception as e:
-            logger.error(f"Streaming error: {str(e)}", exc_info=True)
-            yield f"data: {json.dumps({'error': 'Streaming failed'})}\n\n"
-    
-    return StreamingResponse(
-        generate_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*"
-        }
+            logger.error("Streaming error: %s", e, exc_info=True)
+            yield _STREAM_FAILED_FRAME
+    
+    return await _admitted_stream(generate_stream)
+
+# Response cache for repeatable requests: an in-process LRU with TTL in front of the shared
+# cache manager (Redis when configured), storing encoded bodies so hits skip serialization
+RESPONSE_CACHE_MAX_SIZE = 4096
+RESPONSE_CACHE_TTL = 3600
+_response_cache: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+def _response_cache_key(label: str, request: msgspec.Struct) -> str:
+    """Stable key over the endpoint and every request field"""
+    digest = hashlib.blake2b(label.encode(), digest_size=16)
+    digest.update(b"\0")
+    digest.update(msgspec.json.encode(request))
+    return digest.hexdigest()
+
+async def _get_cached_response(key: str) -> Optional[bytes]:
+    """Look up a response body in the local cache, then the shared cache"""
+    entry = _response_cache.get(key)
+    if entry is not None:
+        if entry[0] > time.monotonic():
+            _response_cache.move_to_end(key)
+            return entry[1]
+        del _response_cache[key]
+    
+    if cache_manager.initialized:
+        response = await cache_manager.get_generation_response(key)
+        if response is not None:
+            body = orjson.dumps(response)
+            _remember_response(key, body)
+            return body
+    
+    return None
+
+def _remember_response(key: str, body: bytes):
+    """Insert into the local cache, evicting the least recently used entry when full"""
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, body)
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_MAX_SIZE:
+        _response_cache.popitem(last=False)
+
+async def _cache_response(key: str, value: GenerationResponse) -> bytes:
+    """Encode a response and store it in both cache levels"""
+    body = _encode(value)
+    _remember_response(key, body)
+    if cache_manager.initialized:
+        await cache_manager.cache_generation_response(key, msgspec.to_builtins(value), RESPONSE_CACHE_TTL)
+    return body
+
+def _cache_hit(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+def _cache_miss(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+async def _run_with_timeout(
+    factory: Callable[[], Awaitable[LLMResponse]],
+    timeout: float,
+    label: str,
+    cache_key: Optional[str] = None
+) -> Response:
+    """Run one LLM call under a timeout and encode the result, mapping failures to HTTP errors"""
+    
+    if cache_key is not None:
+        body = await _get_cached_response(cache_key)
+        if body is not None:
+            return _cache_hit(body)
+    
+    async with _admitted():
+        try:
+            response = await asyncio.wait_for(factory(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=408, detail=f"{label} timeout")
+        except Exception as e:
+            logger.error("%s error: %s", label, e, exc_info=True)
+            raise HTTPException(status_code=500, detail=f"{label} failed")
+    
+    result = GenerationResponse(
+        content=response.content,
+        usage=response.usage,
+        model=response.model,
+        provider=response.metadata.get("provider", "unknown"),
+        timestamp=time.time()
     )
+    
+    if cache_key is None:
+        return _json_response(result)
+    return _cache_miss(await _cache_response(cache_key, result))
 
-@router.post("/code/generate", response_model=GenerationResponse)
+@router.post("/code/generate", responses=_GENERATION_RESPONSES, openapi_extra=_openapi_body(CodeGenerationRequest))
 async def generate_code(
-    request: CodeGenerationRequest,
+    request: CodeGenerationRequest = Depends(msgspec_body(CodeGenerationRequest)),
     current_user: dict = Depends(get_current_user)
-) -> GenerationResponse:
+) -> Response:
     """Generate code with hardening"""
     
-    try:
-        response = await asyncio.wait_for(
-            llm_manager.code_generation(
-                description=request.description,
-                language=request.language,
-                framework=request.framework,
-                features=request.features,
-                style_guide=request.style_guide
-            ),
-            timeout=45.0
-        )
-        
-        return GenerationResponse(
-            content=response.content,
-            usage=response.usage,
-            model=response.model,
-            provider=response.metadata.get("provider", "unknown"),
-            timestamp=time.time()
-        )
-        
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=408, detail="Code generation timeout")
-    except Exception as e:
-        logger.error(f"Code generation error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Code generation failed")
+    return await _run_with_timeout(
+        lambda: llm_manager.code_generation(
+            description=request.description,
+            language=request.language,
+            framework=request.framework,
+            features=request.features,
+            style_guide=request.style_guide
+        ),
+        45.0,
+        "Code generation",
+        cache_key=_response_cache_key("Code generation", request)
+    )
 
-@router.post("/code/explain", response_model=GenerationResponse)
+@router.post("/code/explain", responses=_GENERATION_RESPONSES, openapi_extra=_openapi_body(CodeExplanationRequest))
 async def explain_code(
-    request: CodeExplanationRequest,
+    request: CodeExplanationRequest = Depends(msgspec_body(CodeExplanationRequest)),
     current_user: dict = Depends(get_current_user)
-) -> GenerationResponse:
+) -> Response:
     """Explain code with hardening"""
     
-    try:
-        response = await asyncio.wait_for(
-            llm_manager.code_explanation(
-                code=request.code,
-                language=request.language,
-                focus=request.focus
-            ),
-            timeout=30.0
-        )
-        
-        return GenerationResponse(
-            content=response.content,
-            usage=response.usage,
-            model=response.model,
-            provider=response.metadata.get("provider", "unknown"),
-            timestamp=time.time()
-        )
-        
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=408, detail="Code explanation timeout")
-    except Exception as e:
-        logger.error(f"Code explanation error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Code explanation failed")
+    return await _run_with_timeout(
+        lambda: llm_manager.code_explanation(
+            code=request.code,
+            language=request.language,
+            focus=request.focus
+        ),
+        30.0,
+        "Code explanation",
+        cache_key=_response_cache_key("Code explanation", request)
+    )
 
-@router.post("/code/debug", response_model=GenerationResponse)
+@router.post("/code/debug", responses=_GENERATION_RESPONSES, openapi_extra=_openapi_body(DebugRequest))
 async def debug_code(
-    request: DebugRequest,
+    request: DebugRequest = Depends(msgspec_body(DebugRequest)),
     current_user: dict = Depends(get_current_user)
-) -> GenerationResponse:
+) -> Response:
     """Debug code with hardening"""
     
-    try:
-        response = await asyncio.wait_for(
-            llm_manager.debug_assistance(
-                code=request.code,
-                error=request.error,
-                language=request.language,
-                context=request.context
-            ),
-            timeout=45.0
-        )
-        
-        return GenerationResponse(
-            content=response.content,
-            usage=response.usage,
-            model=response.model,
-            provider=response.metadata.get("provider", "unknown"),
-            timestamp=time.time()
-        )
-        
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=408, detail="Code debugging timeout")
-    except Exception as e:
-        logger.error(f"Code debugging error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Code debugging failed")
+    return await _run_with_timeout(
+        lambda: llm_manager.debug_assistance(
+            code=request.code,
+            error=request.error,
+            language=request.language,
+            context=request.context
+        ),
+        45.0,
+        "Code debugging"
+    )
 
-@router.post("/code/optimize", response_model=GenerationResponse)
+@router.post("/code/optimize", responses=_GENERATION_RESPONSES, openapi_extra=_openapi_body(CodeExplanationRequest))
 async def optimize_code(
-    request: CodeExplanationRequest,
+    request: CodeExplanationRequest = Depends(msgspec_body(CodeExplanationRequest)),
     current_user: dict = Depends(get_current_user)
-) -> GenerationResponse:
+) -> Response:
     """Optimize code with hardening"""
     
-    try:
-        response = await asyncio.wait_for(
-            llm_manager.performance_optimization(
-                code=request.code,
-                language=request.language,
-                metrics={}
-            ),
-            timeout=45.0
-        )
-        
-        return GenerationResponse(
-            content=response.content,
-            usage=response.usage,
-            model=response.model,
-            provider=response.metadata.get("provider", "unknown"),
-            timestamp=time.time()
-        )
-        
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=408, detail="Code optimization timeout")
-    except Exception as e:
-        logger.error(f"Code optimization error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Code optimization failed")
\ No newline at end of file
+    return await _run_with_timeout(
+        lambda: llm_manager.performance_optimization(
+            code=request.code,
+            language=request.language,
+            metrics={}
+        ),
+        45.0,
+        "Code optimization",
+        cache_key=_response_cache_key("Code optimization", request)
+    )
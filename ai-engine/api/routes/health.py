@@ -5,26 +5,120 @@ Health check and readiness endpoints with comprehensive monitoring
 import time
 import asyncio
 import logging
+from dataclasses import dataclass
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from typing import Any, Awaitable, Callable, Dict, Optional
+import orjson
 from ...services.llm_manager import llm_manager
 from ...services.vector_store import vector_store_manager
+from ...services.cache_manager import cache_manager
+from ...services.metrics import metrics_collector
 from ...core.config import settings
+from ...core.clock import uptime_seconds
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/healthz")
-async def health_check() -> Dict[str, Any]:
+# Probe results are reused for a short TTL so liveness, readiness and external monitors
+# polling together trigger at most one round of downstream checks per window
+HEALTH_CACHE_TTL = 1.0
+READY_CACHE_TTL = 2.0
+METRICS_CACHE_TTL = 5.0
+STATUS_CACHE_TTL = 5.0
+
+# Fixed for the life of the process
+_SERVICE_VERSION = getattr(settings, "VERSION", "1.0.0")
+_CONFIGURED_PROVIDER_COUNT = sum(1 for provider in llm_manager.providers if llm_manager.has_api_key(provider))
+
+# Upper bound on any single downstream probe, so a hung dependency cannot stall a probe response
+HEALTH_CHECK_TIMEOUT = 5.0
+
+@dataclass
+class _HealthCache:
+    """Last outcome of one probe plus the refresh currently in flight, if any"""
+    expires_at: float = 0.0
+    payload: Any = None
+    body: bytes = b""
+    error_status: Optional[int] = None
+    error_detail: Any = None
+    refresh: Optional[asyncio.Task] = None
+
+_health_caches: Dict[str, _HealthCache] = {}
+
+def _log_probe_failure(message: str, error: Exception):
+    """Log a failed probe; the traceback is only captured when debug logging is enabled"""
+    logger.error("%s: %s", message, error)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s traceback", message, exc_info=error)
+
+async def _refresh(entry: _HealthCache, ttl: float, producer: Callable[[], Awaitable[Dict[str, Any]]]):
+    """Recompute one probe and store its outcome, success or HTTP error alike"""
+    try:
+        try:
+            entry.payload = await producer()
+            # Encoded once per refresh; every cache hit reuses the bytes
+            entry.body = orjson.dumps(entry.payload)
+            entry.error_status = None
+        except HTTPException as e:
+            entry.payload = None
+            entry.error_status, entry.error_detail = e.status_code, e.detail
+        entry.expires_at = time.monotonic() + ttl
+    finally:
+        entry.refresh = None
+
+async def _fresh_entry(key: str, ttl: float, producer: Callable[[], Awaitable[Dict[str, Any]]]) -> _HealthCache:
+    """Return a probe's cache entry; when stale, every concurrent caller awaits one shared refresh"""
+    entry = _health_caches.get(key)
+    if entry is None:
+        entry = _health_caches[key] = _HealthCache()
+    
+    if time.monotonic() >= entry.expires_at:
+        if entry.refresh is None:
+            entry.refresh = asyncio.create_task(_refresh(entry, ttl, producer))
+        # Shielded so a disconnecting caller does not cancel the refresh the others are waiting on
+        await asyncio.shield(entry.refresh)
+    
+    if entry.error_status is not None:
+        raise HTTPException(status_code=entry.error_status, detail=entry.error_detail)
+    return entry
+
+async def _cached(key: str, ttl: float, producer: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Cached probe payload, for composing into other probes"""
+    return (await _fresh_entry(key, ttl, producer)).payload
+
+async def _cached_response(key: str, ttl: float, producer: Callable[[], Awaitable[Dict[str, Any]]]) -> Response:
+    """Cached probe as a pre-encoded response, skipping jsonable_encoder and response validation"""
+    entry = await _fresh_entry(key, ttl, producer)
+    return Response(content=entry.body, media_type="application/json")
+
+_PROBE_RESPONSES = {200: {"model": Dict[str, Any]}}
+
+@router.get("/live", status_code=204, response_class=Response)
+async def liveness_check() -> Response:
+    """
+    Process liveness endpoint for the Kubernetes liveness probe.
+    Answers from the event loop without touching any dependency, so only a stuck process fails it.
+    """
+    # Probe clients only look at the status code, so there is no body to build or encode
+    return Response(status_code=204)
+
+@router.get("/healthz", responses=_PROBE_RESPONSES)
+async def health_check() -> Response:
     """
     Kubernetes-style health check endpoint.
     Returns 200 if service is healthy, 503 if not.
     """
+    return await _cached_response("healthz", HEALTH_CACHE_TTL, _check_health)
+
+async def _check_health() -> Dict[str, Any]:
+    """Run the health checks behind /healthz"""
     try:
         health_status = {
             "status": "healthy",
             "timestamp": time.time(),
-            "version": settings.VERSION if hasattr(settings, 'VERSION') else "1.0.0",
+            "version": _SERVICE_VERSION,
             "checks": {}
         }
         
@@ -34,45 +128,64 @@ async def health_check() -> Dict[str, Any]:
             "message": "AI Engine service is running"
         }
         
+        # Components are independent, so they are checked concurrently; provider state comes from the background snapshot
+        llm_health, vector_health, cache_health = await asyncio.gather(
+            asyncio.wait_for(llm_manager.current_health(), timeout=HEALTH_CHECK_TIMEOUT),
+            asyncio.wait_for(vector_store_manager.health_check(), timeout=HEALTH_CHECK_TIMEOUT),
+            asyncio.wait_for(cache_manager.health_check(), timeout=HEALTH_CHECK_TIMEOUT),
+            return_exceptions=True
+        )
+        
         # Check LLM manager
-        try:
-            llm_health = await asyncio.wait_for(llm_manager.health_check(), timeout=5.0)
-            health_status["checks"]["llm_manager"] = {
-                "status": "healthy",
-                "providers": llm_health,
-                "default_provider": llm_manager.default_provider.value
-            }
-        except asyncio.TimeoutError:
+        if isinstance(llm_health, asyncio.TimeoutError):
             health_status["checks"]["llm_manager"] = {
                 "status": "timeout",
                 "message": "LLM health check timed out"
             }
             health_status["status"] = "degraded"
-        except Exception as e:
+        elif isinstance(llm_health, Exception):
             health_status["checks"]["llm_manager"] = {
                 "status": "error",
-                "message": str(e)
+                "message": str(llm_health)
             }
             health_status["status"] = "degraded"
+        else:
+            health_status["checks"]["llm_manager"] = {
+                "status": "healthy",
+                "providers": llm_health,
+                "default_provider": llm_manager.default_provider.value
+            }
         
-        # Check vector store manager
-        try:
-            vector_health = await asyncio.wait_for(vector_store_manager.health_check(), timeout=3.0)
+        # Only the LLM manager is critical; a slow vector store or cache is reported without failing the probe
+        if isinstance(vector_health, asyncio.TimeoutError):
+            health_status["checks"]["vector_store"] = {
+                "status": "timeout",
+                "message": "Vector store health check timed out"
+            }
+        elif isinstance(vector_health, Exception):
+            health_status["checks"]["vector_store"] = {
+                "status": "error",
+                "message": str(vector_health)
+            }
+        else:
             health_status["checks"]["vector_store"] = {
                 "status": "healthy" if vector_health["initialized"] else "degraded",
                 "details": vector_health
             }
-        except asyncio.TimeoutError:
-            health_status["checks"]["vector_store"] = {
+        
+        # Check cache manager
+        if isinstance(cache_health, asyncio.TimeoutError):
+            health_status["checks"]["cache"] = {
                 "status": "timeout",
-                "message": "Vector store health check timed out"
+                "message": "Cache health check timed out"
             }
-            health_status["status"] = "degraded"
-        except Exception as e:
-            health_status["checks"]["vector_store"] = {
+        elif isinstance(cache_health, Exception):
+            health_status["checks"]["cache"] = {
                 "status": "error",
-                "message": str(e)
+                "message": str(cache_health)
             }
+        else:
+            health_status["checks"]["cache"] = cache_health
         
         # Return appropriate status code
         if health_status["status"] == "healthy":
@@ -80,8 +193,11 @@ async def health_check() -> Dict[str, Any]:
         else:
             raise HTTPException(status_code=503, detail=health_status)
             
+    except HTTPException:
+        # Degraded and not-ready outcomes carry their own detail; they are not failures of the probe
+        raise
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}", exc_info=True)
+        _log_probe_failure("Health check failed", e)
         error_response = {
             "status": "error",
             "timestamp": time.time(),
@@ -90,12 +206,16 @@ async def health_check() -> Dict[str, Any]:
         }
         raise HTTPException(status_code=503, detail=error_response)
 
-@router.get("/ready")
-async def readiness_check() -> Dict[str, Any]:
+@router.get("/ready", responses=_PROBE_RESPONSES)
+async def readiness_check() -> Response:
     """
     Kubernetes-style readiness check endpoint.
     Returns 200 if service is ready to accept traffic, 503 if not.
     """
+    return await _cached_response("ready", READY_CACHE_TTL, _check_readiness)
+
+async def _check_readiness() -> Dict[str, Any]:
+    """Run the readiness checks behind /ready"""
     try:
         readiness_status = {
             "status": "ready",
@@ -111,30 +231,28 @@ async def readiness_check() -> Dict[str, Any]:
                 "message": "No LLM providers available"
             }
         else:
-            # Test at least one provider
-            working_providers = 0
-            for provider in llm_manager.providers:
-                try:
-                    await asyncio.wait_for(
-                        llm_manager.generate("test", provider=provider, max_tokens=5),
-                        timeout=10.0
-                    )
-                    working_providers += 1
-                    break  # At least one working provider is enough
-                except:
-                    continue
+            # Local signals only: probing with a real generation would bill a provider call per probe
+            configured_providers = _CONFIGURED_PROVIDER_COUNT
             
-            if working_providers > 0:
+            if configured_providers == 0:
+                readiness_status["status"] = "not_ready"
                 readiness_status["checks"]["llm_providers"] = {
-                    "status": "ready",
-                    "working_providers": working_providers,
-                    "total_providers": len(llm_manager.providers)
+                    "status": "error",
+                    "message": "No LLM provider has an API key configured"
                 }
-            else:
+            elif not llm_manager.is_serving():
                 readiness_status["status"] = "not_ready"
                 readiness_status["checks"]["llm_providers"] = {
                     "status": "error",
-                    "message": "No working LLM providers"
+                    "message": "Recent LLM calls are failing",
+                    "last_success_at": llm_manager.last_success_at,
+                    "last_failure_at": llm_manager.last_failure_at
+                }
+            else:
+                readiness_status["checks"]["llm_providers"] = {
+                    "status": "ready",
+                    "configured_providers": configured_providers,
+                    "total_providers": len(llm_manager.providers)
                 }
         
         # Check vector store readiness
@@ -155,8 +273,11 @@ async def readiness_check() -> Dict[str, Any]:
         else:
             raise HTTPException(status_code=503, detail=readiness_status)
             
+    except HTTPException:
+        # Degraded and not-ready outcomes carry their own detail; they are not failures of the probe
+        raise
     except Exception as e:
-        logger.error(f"Readiness check failed: {str(e)}", exc_info=True)
+        _log_probe_failure("Readiness check failed", e)
         error_response = {
             "status": "error",
             "timestamp": time.time(),
@@ -165,56 +286,73 @@ async def readiness_check() -> Dict[str, Any]:
         }
         raise HTTPException(status_code=503, detail=error_response)
 
-@router.get("/metrics")
-async def metrics() -> Dict[str, Any]:
+@router.get("/metrics", response_class=Response)
+async def metrics() -> Response:
     """
-    Basic metrics endpoint for monitoring
+    Prometheus metrics endpoint in the text exposition format.
+    Provider gauges are kept current by their owners, so a scrape only encodes the registry.
     """
+    return Response(content=metrics_collector.get_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+def _build_llm_summary() -> Dict[str, Any]:
+    """Provider summary; providers and their models are fixed once the manager is constructed"""
+    summary = {
+        "available_providers": llm_manager.get_available_providers(),
+        "default_provider": llm_manager.default_provider.value
+    }
+    for provider in llm_manager.providers:
+        try:
+            summary[f"{provider.value}_models"] = llm_manager.get_provider_models(provider)
+        except Exception:
+            pass
+    return summary
+
+# Shared by every metrics summary instead of rebuilding the per-provider dicts on each refresh
+_LLM_SUMMARY = _build_llm_summary()
+
+async def _collect_metrics() -> Dict[str, Any]:
+    """Gather the service metrics summary included in /status"""
     try:
         metrics_data = {
             "timestamp": time.time(),
-            "llm_manager": {
-                "available_providers": llm_manager.get_available_providers(),
-                "default_provider": llm_manager.default_provider.value
-            },
+            "llm_manager": _LLM_SUMMARY,
             "vector_store": {
                 "initialized": vector_store_manager.initialized,
                 "embedding_provider": type(vector_store_manager.embedding_provider).__name__ if vector_store_manager.embedding_provider else None,
                 "store_type": type(vector_store_manager.vector_store).__name__ if vector_store_manager.vector_store else None
-            }
+            },
+            # Background sample; empty until the first one lands or when psutil is not installed
+            "resources": metrics_collector.resource_snapshot
         }
         
-        # Add provider-specific metrics
-        for provider in llm_manager.providers:
-            try:
-                models = llm_manager.get_provider_models(provider)
-                metrics_data["llm_manager"][f"{provider.value}_models"] = models
-            except:
-                pass
-        
         return metrics_data
         
     except Exception as e:
-        logger.error(f"Metrics collection failed: {str(e)}", exc_info=True)
+        _log_probe_failure("Metrics collection failed", e)
         raise HTTPException(status_code=500, detail=f"Metrics collection failed: {str(e)}")
 
-@router.get("/status")
-async def service_status() -> Dict[str, Any]:
+@router.get("/status", responses=_PROBE_RESPONSES)
+async def service_status() -> Response:
     """
     Comprehensive service status endpoint
     """
+    return await _cached_response("status", STATUS_CACHE_TTL, _collect_status)
+
+async def _collect_status() -> Dict[str, Any]:
+    """Assemble /status from the cached health, readiness and metrics probes"""
     try:
         # Get health and readiness
-        health = await health_check()
-        readiness = await readiness_check()
-        metrics = await metrics()
+        health = await _cached("healthz", HEALTH_CACHE_TTL, _check_health)
+        readiness = await _cached("ready", READY_CACHE_TTL, _check_readiness)
+        metrics_data = await _cached("metrics", METRICS_CACHE_TTL, _collect_metrics)
         
         return {
             "service": "AI Engine",
             "timestamp": time.time(),
+            "uptime_seconds": uptime_seconds(),
             "health": health,
             "readiness": readiness,
-            "metrics": metrics
+            "metrics": metrics_data
         }
         
     except HTTPException as e:
@@ -226,5 +364,5 @@ async def service_status() -> Dict[str, Any]:
             "error": e.detail
         }
     except Exception as e:
-        logger.error(f"Status check failed: {str(e)}", exc_info=True)
+        _log_probe_failure("Status check failed", e)
         raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
\ No newline at end of file
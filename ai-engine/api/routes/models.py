@@ -2,17 +2,26 @@
 Model management and information routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Any
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
+from typing import Callable, Dict, List, Any, Literal, Tuple
+from pydantic import BaseModel, ConfigDict
+from functools import lru_cache
+import hashlib
+import orjson
 
 from ...services.llm_manager import llm_manager, LLMProvider
+from ...services.cache_manager import cache_manager
 from ...middleware.auth import get_current_user
-from ...core.config import LLM_MODELS, settings
+from ...core.config import LLM_MODELS, MODEL_SPECS, settings
 
 router = APIRouter()
 
+# Response schemas for the OpenAPI docs; bodies are encoded from precomputed dicts of the same shape,
+# so these are immutable and closed to undeclared fields
 class ModelInfo(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     name: str
     provider: str
     max_tokens: int
@@ -21,146 +30,143 @@ class ModelInfo(BaseModel):
     available: bool
 
 class ProviderInfo(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     name: str
     models: List[ModelInfo]
     available: bool
     api_key_configured: bool
 
-@router.get("/", response_model=List[ProviderInfo])
-async def list_providers() -> List[ProviderInfo]:
+# Provider path parameter: unknown providers are rejected during request validation, before the handler runs
+ProviderName = Literal[tuple(LLM_MODELS)]
+
+# Whether each provider has the API key it needs configured
+_API_KEY_GETTERS: Dict[str, Callable[[], bool]] = {
+    "openai": lambda: bool(settings.OPENAI_API_KEY),
+    "anthropic": lambda: bool(settings.ANTHROPIC_API_KEY),
+    "google": lambda: bool(settings.GOOGLE_API_KEY),
+    "cohere": lambda: bool(settings.COHERE_API_KEY),
+    "ollama": lambda: True,  # Local models don't need API keys
+}
+
+# Settings are frozen after startup, so which providers have keys is decided once
+_KEY_CONFIGURED_PROVIDERS = frozenset(provider for provider, getter in _API_KEY_GETTERS.items() if getter())
+
+# Static part of every model entry, built once from MODEL_SPECS; requests only set availability.
+# Entries are plain dicts in the ModelInfo/ProviderInfo shape: the payload is server-built, so it is
+# encoded directly rather than constructed and validated through Pydantic
+_STATIC_MODEL_INFOS: Dict[str, Dict[str, Dict[str, Any]]] = {provider_name: {} for provider_name in LLM_MODELS}
+for (provider_name, model_name), spec in MODEL_SPECS.items():
+    _STATIC_MODEL_INFOS[provider_name][model_name] = {"name": model_name, "provider": provider_name, **spec._asdict()}
+
+def _require_model(provider: str, model: str):
+    """404 unless the provider offers the model"""
+    if (provider, model) not in MODEL_SPECS:
+        raise HTTPException(status_code=404, detail=f"Model {model} not found for provider {provider}")
+
+def _model_infos(provider: str, available: bool) -> List[Dict[str, Any]]:
+    """A provider's precomputed model entries with availability applied"""
+    return [{**info, "available": available} for info in _STATIC_MODEL_INFOS[provider].values()]
+
+# Providers are fixed once the manager is constructed, so they are resolved once at import
+_AVAILABLE_PROVIDERS = frozenset(llm_manager.get_available_providers())
+
+def _build_provider(provider: str) -> Dict[str, Any]:
+    """Single provider payload"""
+    is_available = provider in _AVAILABLE_PROVIDERS
+    
+    api_key_configured = provider in _KEY_CONFIGURED_PROVIDERS
+    
+    return {
+        "name": provider,
+        "models": _model_infos(provider, is_available and api_key_configured),
+        "available": is_available,
+        "api_key_configured": api_key_configured
+    }
+
+# Listings depend only on LLM_MODELS and the available providers, so each body and its ETag are
+# computed once. Arguments are validated before these are called, so the caches are bounded by LLM_MODELS
+_LISTING_CACHE_CONTROL = "public, max-age=60"
+
+def _encoded(payload: Any) -> Tuple[bytes, str]:
+    """Encode a listing and derive its ETag from the bytes"""
+    body = orjson.dumps(payload)
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+@lru_cache(maxsize=1)
+def _providers_listing() -> Tuple[bytes, str]:
+    """Encoded provider listing"""
+    return _encoded([_build_provider(provider_name) for provider_name in LLM_MODELS])
+
+@lru_cache(maxsize=None)
+def _provider_listing(provider: str) -> Tuple[bytes, str]:
+    """Encoded single provider"""
+    return _encoded(_build_provider(provider))
+
+@lru_cache(maxsize=None)
+def _model_listing(provider: str, model: str) -> Tuple[bytes, str]:
+    """Encoded single model"""
+    return _encoded({**_STATIC_MODEL_INFOS[provider][model], "available": provider in _AVAILABLE_PROVIDERS})
+
+def _listing_response(request: Request, listing: Tuple[bytes, str]) -> Response:
+    """Serve a listing, or a bodiless 304 when the client already holds it"""
+    body, etag = listing
+    headers = {"ETag": etag, "Cache-Control": _LISTING_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/", responses={200: {"model": List[ProviderInfo]}})
+async def list_providers(request: Request) -> Response:
     """List all available LLM providers and their models"""
-    
-    providers = []
-    available_providers = llm_manager.get_available_providers()
-    
-    for provider_name, models in LLM_MODELS.items():
-        is_available = provider_name in available_providers
-        
-        # Check if API key is configured
-        api_key_configured = False
-        if provider_name == "openai":
-            api_key_configured = bool(settings.OPENAI_API_KEY)
-        elif provider_name == "anthropic":
-            api_key_configured = bool(settings.ANTHROPIC_API_KEY)
-        elif provider_name == "google":
-            api_key_configured = bool(settings.GOOGLE_API_KEY)
-        elif provider_name == "cohere":
-            api_key_configured = bool(settings.COHERE_API_KEY)
-        elif provider_name == "ollama":
-            api_key_configured = True  # Local models don't need API keys
-        
-        model_infos = []
-        for model_name, model_config in models.items():
-            model_infos.append(ModelInfo(
-                name=model_name,
-                provider=provider_name,
-                max_tokens=model_config["max_tokens"],
-                supports_streaming=model_config["supports_streaming"],
-                cost_per_1k_tokens=model_config["cost_per_1k_tokens"],
-                available=is_available and api_key_configured
-            ))
-        
-        providers.append(ProviderInfo(
-            name=provider_name,
-            models=model_infos,
-            available=is_available,
-            api_key_configured=api_key_configured
-        ))
-    
-    return providers
+    return _listing_response(request, _providers_listing())
 
-@router.get("/{provider}")
-async def get_provider_models(provider: str) -> ProviderInfo:
+@router.get("/{provider}", responses={200: {"model": ProviderInfo}})
+async def get_provider_models(request: Request, provider: ProviderName) -> Response:
     """Get information about a specific provider"""
-    
-    if provider not in LLM_MODELS:
-        raise HTTPException(status_code=404, detail=f"Provider {provider} not found")
-    
-    available_providers = llm_manager.get_available_providers()
-    is_available = provider in available_providers
-    
-    # Check if API key is configured
-    api_key_configured = False
-    if provider == "openai":
-        api_key_configured = bool(settings.OPENAI_API_KEY)
-    elif provider == "anthropic":
-        api_key_configured = bool(settings.ANTHROPIC_API_KEY)
-    elif provider == "google":
-        api_key_configured = bool(settings.GOOGLE_API_KEY)
-    elif provider == "cohere":
-        api_key_configured = bool(settings.COHERE_API_KEY)
-    elif provider == "ollama":
-        api_key_configured = True
-    
-    models = LLM_MODELS[provider]
-    model_infos = []
-    
-    for model_name, model_config in models.items():
-        model_infos.append(ModelInfo(
-            name=model_name,
-            provider=provider,
-            max_tokens=model_config["max_tokens"],
-            supports_streaming=model_config["supports_streaming"],
-            cost_per_1k_tokens=model_config["cost_per_1k_tokens"],
-            available=is_available and api_key_configured
-        ))
-    
-    return ProviderInfo(
-        name=provider,
-        models=model_infos,
-        available=is_available,
-        api_key_configured=api_key_configured
-    )
-
-@router.get("/{provider}/{model}")
-async def get_model_info(provider: str, model: str) -> ModelInfo:
+    return _listing_response(request, _provider_listing(provider))
+
+@router.get("/{provider}/{model}", responses={200: {"model": ModelInfo}})
+async def get_model_info(request: Request, provider: ProviderName, model: str) -> Response:
     """Get information about a specific model"""
     
-    if provider not in LLM_MODELS:
-        raise HTTPException(status_code=404, detail=f"Provider {provider} not found")
+    _require_model(provider, model)
     
-    if model not in LLM_MODELS[provider]:
-        raise HTTPException(status_code=404, detail=f"Model {model} not found for provider {provider}")
-    
-    available_providers = llm_manager.get_available_providers()
-    is_available = provider in available_providers
-    
-    model_config = LLM_MODELS[provider][model]
-    
-    return ModelInfo(
-        name=model,
-        provider=provider,
-        max_tokens=model_config["max_tokens"],
-        supports_streaming=model_config["supports_streaming"],
-        cost_per_1k_tokens=model_config["cost_per_1k_tokens"],
-        available=is_available
-    )
+    return _listing_response(request, _model_listing(provider, model))
+
+# Model tests send a fixed prompt, so a recent success is reused rather than paying for another call.
+# Kept short so a test still reflects the provider's current state; failures are never cached
+MODEL_TEST_PROMPT = "Say 'Hello, I am working correctly!' in a friendly way."
+MODEL_TEST_MAX_TOKENS = 50
+MODEL_TEST_CACHE_TTL = 900
 
 @router.post("/{provider}/{model}/test")
 async def test_model(
-    provider: str,
+    provider: ProviderName,
     model: str,
     current_user: dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Test a specific model with a simple generation"""
     
-    if provider not in LLM_MODELS:
-        raise HTTPException(status_code=404, detail=f"Provider {provider} not found")
+    _require_model(provider, model)
     
-    if model not in LLM_MODELS[provider]:
-        raise HTTPException(status_code=404, detail=f"Model {model} not found for provider {provider}")
+    if cache_manager.initialized:
+        cached = await cache_manager.get_llm_response(MODEL_TEST_PROMPT, provider, model)
+        if cached is not None:
+            return {**cached, "cached": True}
     
     try:
         provider_enum = LLMProvider(provider)
         
         response = await llm_manager.generate(
-            prompt="Say 'Hello, I am working correctly!' in a friendly way.",
+            prompt=MODEL_TEST_PROMPT,
             provider=provider_enum,
             model=model,
-            max_tokens=50
+            max_tokens=MODEL_TEST_MAX_TOKENS
         )
         
-        return {
+        result = {
             "success": True,
             "response": response.content,
             "usage": response.usage,
@@ -173,4 +179,8 @@ async def test_model(
             "error": str(e),
             "provider": provider,
             "model": model
-        }
\ No newline at end of file
+        }
+    
+    if cache_manager.initialized:
+        await cache_manager.cache_llm_response(MODEL_TEST_PROMPT, provider, model, result, ttl=MODEL_TEST_CACHE_TTL)
+    return result
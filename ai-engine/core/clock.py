@@ -0,0 +1,28 @@
+"""
+Cheap wall-clock timestamps for response payloads
+"""
+
+import time
+
+_cached_second = -1
+_cached_iso = "1970-01-01T00:00:00Z"
+
+# Process start on the monotonic clock, immune to wall-clock adjustments
+_started_at = time.monotonic()
+
+def utc_now_iso() -> str:
+    """Current UTC time as an RFC 3339 string with second resolution.
+
+    The formatted string is reused until the second changes, so hot paths
+    avoid building a datetime and calling strftime on every request.
+    """
+    global _cached_second, _cached_iso
+    now = int(time.time())
+    if now != _cached_second:
+        _cached_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        _cached_second = now
+    return _cached_iso
+
+def uptime_seconds() -> float:
+    """Seconds since this module was imported, i.e. since process start"""
+    return time.monotonic() - _started_at
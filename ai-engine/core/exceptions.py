@@ -22,6 +22,10 @@ class AgentError(AIEngineError):
     """Agent-related errors"""
     pass
 
+class AgentCapacityError(AgentError):
+    """Agent task queue is saturated"""
+    pass
+
 class VectorStoreError(AIEngineError):
     """Vector store related errors"""
     pass
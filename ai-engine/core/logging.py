@@ -5,14 +5,48 @@ Structured logging configuration for AI Engine
 import logging
 import logging.config
 import json
+import re
 import sys
 import time
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 from .config import settings
 
+# Timestamps serialize as RFC 3339 with a trailing Z; non-string keys in extra fields are
+# stringified as the json module does
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+# Process handle for PerformanceFilter; its /proc reads are sampled, never made per record
+_PROC = psutil.Process() if psutil is not None else None
+PERFORMANCE_SAMPLE_INTERVAL = 0.5
+
+# Standard LogRecord attributes, never copied into the structured extra fields
+_RESERVED_ATTRS = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
+    'filename', 'module', 'lineno', 'funcName', 'created',
+    'msecs', 'relativeCreated', 'thread', 'threadName',
+    'processName', 'process', 'getMessage', 'exc_info',
+    'exc_text', 'stack_info', 'message', 'asctime'
+})
+
+def _json_default(value: Any) -> str:
+    """Fallback encoder for values the stdlib json module cannot serialize"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
 class StructuredFormatter(logging.Formatter):
     """Custom formatter for structured JSON logging"""
     
@@ -21,7 +55,7 @@ class StructuredFormatter(logging.Formatter):
         
         # Base log structure
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -36,16 +70,13 @@ class StructuredFormatter(logging.Formatter):
         
         # Add extra fields from record
         for key, value in record.__dict__.items():
-            if key not in {
-                'name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
-                'filename', 'module', 'lineno', 'funcName', 'created',
-                'msecs', 'relativeCreated', 'thread', 'threadName',
-                'processName', 'process', 'getMessage', 'exc_info',
-                'exc_text', 'stack_info'
-            } and not key.startswith('_'):
-                log_entry[key] = value
+            if key in _RESERVED_ATTRS or key[0] == '_':
+                continue
+            log_entry[key] = value
         
-        return json.dumps(log_entry, default=str)
+        if orjson is not None:
+            return orjson.dumps(log_entry, default=str, option=_ORJSON_OPTIONS).decode()
+        return json.dumps(log_entry, default=_json_default)
 
 class RequestContextFilter(logging.Filter):
     """Filter to add request context to log records"""
@@ -85,21 +116,24 @@ class PerformanceFilter(logging.Filter):
     def __init__(self):
         super().__init__()
         self.start_times: Dict[str, float] = {}
+        self._last_sample = 0.0
+        self._memory_mb = 0.0
+        self._cpu_percent = 0.0
     
     def filter(self, record: logging.LogRecord) -> bool:
         """Add performance metrics to log record"""
         
         # Add timestamp
-        record.timestamp_unix = time.time()
+        record.timestamp_unix = record.created
         
-        # Add memory usage if psutil is available
-        try:
-            import psutil
-            process = psutil.Process()
-            record.memory_mb = process.memory_info().rss / 1024 / 1024
-            record.cpu_percent = process.cpu_percent()
-        except ImportError:
-            pass
+        # Add memory usage if psutil is available, refreshed at most once per sample interval
+        if _PROC is not None:
+            if record.created - self._last_sample >= PERFORMANCE_SAMPLE_INTERVAL:
+                self._memory_mb = _PROC.memory_info().rss / 1024 / 1024
+                self._cpu_percent = _PROC.cpu_percent(None)
+                self._last_sample = record.created
+            record.memory_mb = self._memory_mb
+            record.cpu_percent = self._cpu_percent
         
         return True
     
@@ -124,6 +158,13 @@ class SecurityFilter(logging.Filter):
         'ssn', 'social_security'
     }
     
+    # Card numbers, email addresses and prefixed API keys, matched in a single scan of the text
+    _SENSITIVE_RE = re.compile(
+        r'(?P<cc>\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b)'
+        r'|\b(?P<email_user>[a-zA-Z0-9._%+-]+)@(?P<email_domain>[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b'
+        r'|\b(?P<key_prefix>sk-|pk-|rk-)[a-zA-Z0-9]{20,}\b'
+    )
+    
     def filter(self, record: logging.LogRecord) -> bool:
         """Sanitize sensitive information from log record"""
         
@@ -147,19 +188,25 @@ class SecurityFilter(logging.Filter):
     
     def _sanitize_text(self, text: str) -> str:
         """Sanitize sensitive information from text"""
-        # Simple pattern matching for common sensitive data
-        import re
+        # Card numbers need 16 digits and API keys 23 characters; emails need an '@'
+        if len(text) < 16 and '@' not in text:
+            return text
         
+        return self._SENSITIVE_RE.sub(self._mask, text)
+    
+    @staticmethod
+    def _mask(match: re.Match) -> str:
+        """Replacement for one sensitive match"""
         # Credit card numbers
-        text = re.sub(r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b', '[CREDIT_CARD]', text)
+        if match['cc'] is not None:
+            return '[CREDIT_CARD]'
         
         # Email addresses (partial masking)
-        text = re.sub(r'\b([a-zA-Z0-9._%+-]+)@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b', r'\1***@\2', text)
+        if match['email_user'] is not None:
+            return f"{match['email_user']}***@{match['email_domain']}"
         
         # API keys (pattern: starts with specific prefixes)
-        text = re.sub(r'\b(sk-|pk-|rk-)[a-zA-Z0-9]{20,}\b', r'\1[REDACTED]', text)
-        
-        return text
+        return f"{match['key_prefix']}[REDACTED]"
     
     def _sanitize_value(self, value: Any) -> Any:
         """Sanitize a value recursively"""
@@ -5,19 +5,26 @@ AI Engine - FastAPI-based service for LLM orchestration and AI capabilities
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, WebSocket, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from contextlib import asynccontextmanager
+from functools import lru_cache
 import uvicorn
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import json
 import time
 from pydantic import BaseModel, Field, validator
 import re
 import sys
+import uuid
 
 import os
 from dotenv import load_dotenv
@@ -40,20 +47,67 @@ except ImportError:
 
 try:
     from .services.llm_manager import llm_manager
-    from .services.provider_selector import provider_selector
+    from .services.provider_selector import provider_selector, PROVIDER_API_KEY_ENV
+    from .services.agent_manager import agent_manager
+    from .services.metrics import metrics_collector
+    from .core.exceptions import AgentCapacityError
 except ImportError:
     # Create basic llm_manager if module doesn't exist
     from services.llm_manager import llm_manager
-    from services.provider_selector import provider_selector
+    from services.provider_selector import provider_selector, PROVIDER_API_KEY_ENV
+    from services.agent_manager import agent_manager
+    from services.metrics import metrics_collector
+    from core.exceptions import AgentCapacityError
 
-# Setup logging
-def setup_logging():
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves layout to the listener thread but freezes each record's content"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same freezing as the stdlib prepare, minus the full format: args are merged now because the
+        # caller may mutate them, and the traceback is rendered now so the queue does not keep its
+        # frames, and every local they reference, alive until the listener drains it
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_exc_formatter = logging.Formatter()
+
+# Setup logging: request tasks only enqueue records; a background listener formats and writes them
+def setup_logging() -> logging.handlers.QueueListener:
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
-
-setup_logging()
+    
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    for handler in handlers:
+        root.removeHandler(handler)
+    
+    log_queue = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Stopped at interpreter exit rather than in the lifespan so late shutdown records are still flushed
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
 # Managers are imported from their modules
@@ -63,17 +117,35 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     logger.info("Starting AI Engine...")
     
-    # Initialize services - only llm_manager for now
+    # Shared HTTP client, reused by every provider call instead of per-call connects
+    app.state.http = None
+    if httpx:
+        # HTTP/2 multiplexes concurrent provider streams over a few TLS connections
+        app.state.http = httpx.AsyncClient(
+            http2=h2 is not None,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64, keepalive_expiry=30)
+        )
+    
+    # Initialize services
     if hasattr(llm_manager, 'initialize'):
-        await llm_manager.initialize()
+        await llm_manager.initialize(http_client=app.state.http)
+    await provider_selector.initialize()
+    metrics_collector.start_resource_sampler()
+    await agent_manager.initialize()
     
     logger.info("AI Engine started successfully")
     yield
     
     # Cleanup
     logger.info("Shutting down AI Engine...")
+    await agent_manager.cleanup()
+    await provider_selector.cleanup()
+    await metrics_collector.stop_resource_sampler()
     if hasattr(llm_manager, 'cleanup'):
         await llm_manager.cleanup()
+    if app.state.http is not None:
+        await app.state.http.aclose()
     logger.info("AI Engine shutdown complete")
 
 # Create FastAPI app
@@ -83,6 +155,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # Handlers returning plain payloads are serialized with orjson rather than the stdlib encoder
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -97,7 +171,26 @@ app.add_middleware(
 
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Request-scoped auth context
+try:
+    from .middleware.auth import RequestUserContextMiddleware
+    app.add_middleware(RequestUserContextMiddleware)
+except ImportError:
+    try:
+        from middleware.auth import RequestUserContextMiddleware
+        app.add_middleware(RequestUserContextMiddleware)
+    except ImportError:
+        logger.warning("Auth middleware not available - user context caching disabled")
+
+# Reject oversize generation bodies before they are read and parsed
+try:
+    from .middleware.body_limit import BodySizeLimitMiddleware
+except ImportError:
+    from middleware.body_limit import BodySizeLimitMiddleware
+app.add_middleware(BodySizeLimitMiddleware, path_prefixes=("/generation", "/api/v1/generation", "/api/v1/code"))
+
 # Include API routes
+hardened_routes_loaded = True
 try:
     from .api.routes.health import router as health_router
     from .api.routes.generation import router as generation_router
@@ -112,100 +205,87 @@ except ImportError:
         app.include_router(generation_router, prefix="/api/v1", tags=["generation"])
         logger.info("Loaded hardened API routes")
     except ImportError:
+        hardened_routes_loaded = False
         logger.warning("API routes not available - using built-in endpoints")
 
 # Add request ID middleware for tracking
 @app.middleware("http")
 async def add_request_id(request: Request, call_next):
-    import uuid
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     request.state.request_id = request_id
     
-    start_time = time.time()
+    start_time = time.monotonic()
     response = await call_next(request)
-    process_time = time.time() - start_time
+    process_time = time.monotonic() - start_time
     
     response.headers["X-Request-ID"] = request_id
     response.headers["X-Process-Time"] = str(process_time)
     
     return response
 
+# Static info and probe bodies are encoded once; only the timestamp is spliced in per request
+_ROOT_TMPL = (
+    b'{"service":"Myco AI Engine","version":"1.0.0","status":"running","timestamp":%r,'
+    b'"capabilities":["multi-model LLM support","code generation","AI assistance"]}'
+)
+_PING_TMPL = b'{"message":"pong","timestamp":%r}'
+
+def _timestamped(template: bytes) -> Response:
+    """Render a pre-encoded body with the current time"""
+    return Response(content=template % time.time(), media_type="application/json")
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "service": "Myco AI Engine",
-        "version": "1.0.0",
-        "status": "running",
-        "timestamp": time.time(),
-        "capabilities": [
-            "multi-model LLM support",
-            "code generation",
-            "AI assistance"
-        ]
-    }
+    return _timestamped(_ROOT_TMPL)
+
+async def live():
+    """Liveness probe endpoint; answers from the event loop without touching any dependency"""
+    return Response(status_code=204)
+
+@lru_cache(maxsize=1)
+def _provider_view(configured: frozenset) -> Tuple[bytes, Dict[str, bool]]:
+    """Provider-dependent probe parts: the /healthz template and the configured-key map"""
+    # Keyed on the selector's key set, so this is rebuilt once after reload_api_keys() and reused until the next one
+    healthz_template = (
+        b'{"status":"healthy","service":"ai-engine","version":"1.0.0","timestamp":%r,"llm_providers":'
+        + json.dumps(llm_manager.get_available_providers()).encode()
+        + b'}'
+    )
+    return healthz_template, {provider: provider in configured for provider in PROVIDER_API_KEY_ENV}
 
-@app.get("/healthz")
 async def healthz():
-    """Kubernetes health check endpoint"""
-    try:
-        # Basic health checks
-        health_status = {
-            "status": "healthy",
-            "service": "ai-engine",
-            "version": "1.0.0",
-            "timestamp": time.time()
-        }
-        
-        # Check LLM manager
-        if hasattr(llm_manager, 'health_check'):
-            health_status["llm_manager"] = await llm_manager.health_check()
-        else:
-            health_status["llm_manager"] = "available"
-        
-        return health_status
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(status_code=503, detail="Service unhealthy")
+    """Kubernetes health check endpoint; process-level only, provider state belongs to /ready"""
+    healthz_template, _ = _provider_view(provider_selector.configured_providers)
+    return _timestamped(healthz_template)
 
 @app.get("/health")
 async def health():
     """Legacy health check endpoint"""
     return await healthz()
 
-@app.get("/ready")
+# Resolved once: the manager's shape does not change at runtime
+_llm_is_serving = getattr(llm_manager, 'is_serving', None)
+
 async def ready():
     """Readiness check endpoint"""
     try:
         # Check if LLM manager is available
         providers = llm_manager.get_available_providers()
-        
-        # Check environment variables for any configured providers
-        has_openai = bool(os.getenv("OPENAI_API_KEY"))
-        has_anthropic = bool(os.getenv("ANTHROPIC_API_KEY"))
-        has_google = bool(os.getenv("GOOGLE_API_KEY"))
+        _, configured_providers = _provider_view(provider_selector.configured_providers)
         
         status = "ready"
-        if not (has_openai or has_anthropic or has_google):
+        if not provider_selector.configured_providers:
             status = "degraded"  # Running with stub provider only
         
-        # Test a simple generation to ensure providers are working
-        try:
-            test_response = await llm_manager.generate("test", max_tokens=1)
-            if not test_response or not test_response.content:
-                status = "degraded"
-        except Exception as test_error:
-            logger.warning(f"Provider test failed: {test_error}")
+        # Judge providers by the outcome of real traffic instead of a paid test generation per probe
+        if _llm_is_serving is not None and not _llm_is_serving():
             status = "degraded"
         
         return {
             "status": status,
             "providers_available": providers,
-            "configured_providers": {
-                "openai": has_openai,
-                "anthropic": has_anthropic,
-                "google": has_google
-            }
+            "configured_providers": configured_providers
         }
     except Exception as e:
         logger.error(f"Readiness check failed: {e}")
@@ -487,39 +567,65 @@ async def _handle_streaming_generation(payload: Dict[str, Any]):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.warning(f"Validation error on {request.url}: {exc}")
-    return {
-        "error": "Validation failed",
-        "details": exc.errors(),
-        "status_code": 422,
-        "timestamp": time.time()
-    }
+    return ORJSONResponse(
+        status_code=422,
+        content={
+            "error": "Validation failed",
+            "details": jsonable_encoder(exc.errors()),
+            "status_code": 422,
+            "timestamp": time.time()
+        }
+    )
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     logger.warning(f"HTTP exception on {request.url}: {exc.detail}")
-    return {
-        "error": exc.detail,
-        "status_code": exc.status_code,
-        "timestamp": time.time()
-    }
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={
+            "error": exc.detail,
+            "status_code": exc.status_code,
+            "timestamp": time.time()
+        },
+        headers=getattr(exc, "headers", None)
+    )
 
+# Saturated agent queue: shed load and ask the client to retry
+AGENT_RETRY_AFTER_SECONDS = "5"
+
+@app.exception_handler(AgentCapacityError)
+async def agent_capacity_exception_handler(request: Request, exc: AgentCapacityError):
+    logger.warning(f"Agent queue saturated on {request.url}: {exc}")
+    return ORJSONResponse(
+        status_code=503,
+        content={
+            "error": str(exc),
+            "status_code": 503,
+            "timestamp": time.time()
+        },
+        headers={"Retry-After": AGENT_RETRY_AFTER_SECONDS}
+    )
+
+# Single serializer for unhandled errors; route handlers let exceptions propagate here
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     logger.error(f"Unhandled exception on {request.url}: {exc}", exc_info=True)
-    return {
-        "error": "Internal server error",
-        "status_code": 500,
-        "timestamp": time.time(),
-        "request_id": getattr(request.state, 'request_id', 'unknown')
-    }
+    return ORJSONResponse(
+        status_code=500,
+        content={
+            "error": "Internal server error",
+            "status_code": 500,
+            "timestamp": time.time(),
+            "request_id": getattr(request.state, 'request_id', 'unknown')
+        }
+    )
 
 # Health check endpoints
 @app.get("/ping")
 async def ping():
     """Simple ping endpoint"""
-    return {"message": "pong", "timestamp": time.time()}
+    return _timestamped(_PING_TMPL)
 
-@app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
     try:
@@ -532,6 +638,14 @@ async def metrics():
             "timestamp": time.time()
         }
 
+# The health router owns these paths; the built-in versions are only registered when it failed to load,
+# so each path has exactly one handler instead of a shadowed duplicate
+if not hardened_routes_loaded:
+    app.add_api_route("/live", live, methods=["GET"], status_code=204, response_class=Response)
+    app.add_api_route("/healthz", healthz, methods=["GET"])
+    app.add_api_route("/ready", ready, methods=["GET"])
+    app.add_api_route("/metrics", metrics, methods=["GET"])
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -540,5 +654,11 @@ if __name__ == "__main__":
         reload=settings.DEBUG,
         workers=settings.WORKERS if not settings.DEBUG else 1,
         log_level=settings.LOG_LEVEL.lower(),
-        access_log=True
+        access_log=True,
+        # "auto" picks uvloop where it is installed; requirements.txt skips it on Windows
+        loop="auto",
+        http="httptools",
+        backlog=4096,
+        timeout_keep_alive=30,
+        limit_concurrency=2000
     )
\ No newline at end of file
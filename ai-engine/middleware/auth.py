@@ -2,20 +2,55 @@
 Authentication middleware for the AI Engine
 """
 
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
 import jwt
 import time
 
-from ..core.config import settings
+try:
+    from ..core.config import settings
+except ImportError:
+    from core.config import settings
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer(auto_error=False)
 
+# Auth settings read on every request are resolved once; API keys get O(1) membership
+_ALLOWED_API_KEYS = frozenset(settings.ALLOWED_API_KEYS)
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+
+# Verified tokens are remembered briefly so repeat requests skip signature verification;
+# an entry never outlives the token's own expiry
+TOKEN_CACHE_TTL = 60.0
+TOKEN_CACHE_MAX_SIZE = 10_000
+_verified_tokens: Dict[bytes, Tuple[float, Dict[str, Any]]] = {}
+
+# User resolved for the current request; lets nested callers skip re-verifying the token
+_current_user: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_user", default=None)
+
+class RequestUserContextMiddleware:
+    """ASGI middleware giving every request a fresh user context"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = _current_user.set(None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_user.reset(token)
+
 class AuthMiddleware(BaseHTTPMiddleware):
     """Authentication middleware"""
     
@@ -36,7 +71,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
         
         # Check for API key authentication first
         api_key = request.headers.get("X-API-Key")
-        if api_key and api_key in settings.ALLOWED_API_KEYS:
+        if api_key and api_key in _ALLOWED_API_KEYS:
             request.state.user = {
                 "user_id": f"api-key-{api_key[:8]}",
                 "api_key": True
@@ -63,11 +98,33 @@ class AuthMiddleware(BaseHTTPMiddleware):
 async def verify_jwt_token(token: str) -> Dict[str, Any]:
     """Verify JWT token and return user info"""
     
+    # Keyed by digest so raw tokens are not kept in memory
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    entry = _verified_tokens.get(key)
+    now = time.time()
+    if entry is not None:
+        if entry[0] > now:
+            return entry[1]
+        del _verified_tokens[key]
+    
+    user = _decode_jwt_token(token)
+    
+    expires_at = now + TOKEN_CACHE_TTL
+    if user["exp"]:
+        expires_at = min(expires_at, user["exp"])
+    if len(_verified_tokens) >= TOKEN_CACHE_MAX_SIZE:
+        del _verified_tokens[next(iter(_verified_tokens))]
+    _verified_tokens[key] = (expires_at, user)
+    return user
+
+def _decode_jwt_token(token: str) -> Dict[str, Any]:
+    """Check a token's signature and claims"""
+    
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
+            algorithms=_JWT_ALGORITHMS
         )
         
         # Check expiration
@@ -98,6 +155,21 @@ async def get_current_user(
 ) -> Dict[str, Any]:
     """Get current authenticated user"""
     
+    # Already resolved earlier in this request
+    user = _current_user.get()
+    if user is not None:
+        return user
+    
+    user = await _resolve_user(request, credentials)
+    _current_user.set(user)
+    return user
+
+async def _resolve_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials]
+) -> Dict[str, Any]:
+    """Authenticate the request from middleware state, dev mode, API key or JWT"""
+    
     # If user is already set by middleware, return it
     if hasattr(request.state, "user"):
         return request.state.user
@@ -112,7 +184,7 @@ async def get_current_user(
     
     # Check for API key in headers
     api_key = request.headers.get("X-API-Key")
-    if api_key and api_key in settings.ALLOWED_API_KEYS:
+    if api_key and api_key in _ALLOWED_API_KEYS:
         return {
             "user_id": f"api-key-{api_key[:8]}",
             "api_key": True
@@ -0,0 +1,82 @@
+"""
+Request body size limiting middleware for the AI Engine
+"""
+
+import logging
+import time
+from typing import Sequence
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Comfortably above the largest valid generation payload (50k-char prompt plus 20k-char context)
+MAX_REQUEST_BODY_SIZE = 512 * 1024
+
+class _BodyTooLarge(Exception):
+    """Raised from the wrapped receive channel once the body budget is exceeded"""
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware rejecting oversize request bodies with 413 before they are buffered or parsed"""
+
+    def __init__(self, app, max_body_size: int = MAX_REQUEST_BODY_SIZE, path_prefixes: Sequence[str] = ("/",)):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        # Declared length: reject without reading a single byte
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body_size:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        # Chunked or understated bodies: count bytes as they arrive
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if exceeded and not response_started:
+                # FastAPI turns a failed body read into its own 400; the 413 below replaces it
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        logger.warning(f"Rejected oversize request body on {scope['path']} (limit {self.max_body_size} bytes)")
+        response = JSONResponse(
+            status_code=413,
+            content={
+                "error": "Request body too large",
+                "status_code": 413,
+                "timestamp": time.time()
+            }
+        )
+        await response(scope, receive, send)
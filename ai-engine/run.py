@@ -42,7 +42,13 @@ def main():
         workers=settings.WORKERS if not settings.DEBUG else 1,
         log_level=settings.LOG_LEVEL.lower(),
         access_log=True,
-        reload_dirs=[str(ai_engine_dir)] if settings.DEBUG else None
+        reload_dirs=[str(ai_engine_dir)] if settings.DEBUG else None,
+        # "auto" picks uvloop where it is installed; requirements.txt skips it on Windows
+        loop="auto",
+        http="httptools",
+        backlog=4096,
+        timeout_keep_alive=30,
+        limit_concurrency=2000
     )
 
 if __name__ == "__main__":
@@ -5,16 +5,46 @@ Agent management service for orchestrating AI agents
 import asyncio
 import json
 import logging
-import uuid
-from typing import Dict, List, Any, Optional, Callable
+import os
+from uuid import uuid4 as _uuid4
+from typing import Dict, List, Any, Optional, Callable, Set, AsyncIterator, Tuple
+from collections import Counter
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+from itertools import islice
+import orjson
 
 from .llm_manager import llm_manager, LLMProvider
+from . import task_queue
+
+try:
+    from ..core.clock import utc_now_iso
+    from ..core.exceptions import AgentCapacityError
+except ImportError:
+    from core.clock import utc_now_iso
+    from core.exceptions import AgentCapacityError
+
+try:
+    from .metrics import metrics_collector
+except ImportError:
+    metrics_collector = None
 
 logger = logging.getLogger(__name__)
 
+# In-process tasks admitted but not yet started; create_task rejects work beyond this
+MAX_PENDING_AGENT_TASKS = int(os.getenv("MAX_PENDING_AGENT_TASKS", "1000"))
+
+# Seconds between rebuilds of the serialized status snapshot
+STATUS_SNAPSHOT_INTERVAL = 5.0
+
+# Error recorded on tasks that were still waiting when their session was cancelled
+SESSION_CANCELLED_MESSAGE = "Session cancelled"
+
+def _new_id() -> str:
+    """Generate a compact random identifier"""
+    return _uuid4().hex
+
 class AgentType(Enum):
     ORCHESTRATOR = "orchestrator"
     PLANNER = "planner"
@@ -33,9 +63,13 @@ class AgentStatus(Enum):
     ERROR = "error"
     COMPLETED = "completed"
 
+# Enum members never change, so their values are resolved once at import
+AGENT_TYPE_VALUES = tuple(agent_type.value for agent_type in AgentType)
+AGENT_STATUS_VALUES = tuple(agent_status.value for agent_status in AgentStatus)
+
 @dataclass
 class AgentTask:
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_new_id)
     type: str = ""
     description: str = ""
     input_data: Dict[str, Any] = field(default_factory=dict)
@@ -49,10 +83,10 @@ class AgentTask:
 
 @dataclass
 class Agent:
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
     type: AgentType
     name: str
     description: str
+    id: str = field(default_factory=_new_id)
     capabilities: List[str] = field(default_factory=list)
     status: AgentStatus = AgentStatus.IDLE
     current_task: Optional[AgentTask] = None
@@ -61,13 +95,64 @@ class Agent:
     last_active: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+@dataclass
+class AgentSession:
+    project_id: str
+    user_id: str
+    session_type: str
+    requirements: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=_new_id)
+    task_ids: List[str] = field(default_factory=list)
+    cancelled: bool = False
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+TERMINAL_TASK_STATUSES = frozenset({AgentStatus.COMPLETED.value, AgentStatus.ERROR.value})
+_TERMINAL_STATUSES = frozenset({AgentStatus.COMPLETED, AgentStatus.ERROR})
+
+# Session type -> (agent type, task type) of the task that starts the session
+SESSION_ENTRY_TASKS = {
+    "project_generation": (AgentType.ORCHESTRATOR, "coordinate_project"),
+    "code_review": (AgentType.SECURITY, "security_audit"),
+    "debugging": (AgentType.BACKEND, "debugging"),
+}
+DEFAULT_SESSION_ENTRY_TASK = (AgentType.ORCHESTRATOR, "coordinate_project")
+
+def task_snapshot(task: AgentTask) -> Dict[str, Any]:
+    """JSON-ready view of a task's progress"""
+    return {
+        "task_id": task.id,
+        "status": task.status.value,
+        "result": task.output_data or None,
+        "error": task.error_message,
+        "completed_at": task.completed_at.isoformat() if task.completed_at else None
+    }
+
+def agent_snapshot(agent: Agent) -> Dict[str, Any]:
+    """JSON-ready view of an agent's current state"""
+    return {
+        "agent_id": agent.id,
+        "name": agent.name,
+        "type": agent.type.value,
+        "status": agent.status.value,
+        "current_task": agent.current_task.id if agent.current_task else None,
+        "queue_length": len(agent.task_queue),
+        "last_active": agent.last_active.isoformat()
+    }
+
 class AgentManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.agents: Dict[str, Agent] = {}
         self.tasks: Dict[str, AgentTask] = {}
+        self.sessions: Dict[str, AgentSession] = {}
         self.agent_callbacks: Dict[AgentType, Callable] = {}
+        # Per-task listeners notified on every status transition
+        self.task_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.pending_tasks = 0
         self.running = False
+        # Serialized get_status() payload, rebuilt on a fixed interval for cheap scraping
+        self.status_snapshot: bytes = b""
         self._register_default_agents()
     
     async def initialize(self):
@@ -75,8 +160,9 @@ class AgentManager:
         self.logger.info("Initializing Agent Manager...")
         self.running = True
         
-        # Start the task processing loop
+        # Start the task processing and status snapshot loops
         asyncio.create_task(self._process_tasks())
+        asyncio.create_task(self._status_snapshot_loop())
         self.logger.info("Agent Manager initialized successfully")
     
     async def cleanup(self):
@@ -215,6 +301,34 @@ class AgentManager:
     ) -> str:
         """Create a new task for an agent"""
         
+        # Find available agent of the specified type
+        agent = self._get_agent_by_type(agent_type)
+        if not agent:
+            raise ValueError(f"No agent available for type: {agent_type}")
+        
+        if task_queue.is_enabled():
+            # Hand the work to the worker pool; the job id becomes the task id
+            job_id = task_queue.enqueue_agent_task(
+                agent_type.value,
+                task_type,
+                description,
+                input_data,
+                priority="high" if priority > 1 else "normal"
+            )
+            task = AgentTask(
+                id=job_id,
+                type=task_type,
+                description=description,
+                input_data=input_data,
+                metadata={"priority": priority, "queued": True}
+            )
+            self.tasks[task.id] = task
+            self.logger.info(f"Queued task {task.id} for agent {agent.name}")
+            return task.id
+        
+        if self.pending_tasks >= MAX_PENDING_AGENT_TASKS:
+            raise AgentCapacityError(f"Agent task queue is full ({MAX_PENDING_AGENT_TASKS} pending)")
+        
         task = AgentTask(
             type=task_type,
             description=description,
@@ -222,21 +336,69 @@ class AgentManager:
             metadata={"priority": priority}
         )
         
-        # Find available agent of the specified type
-        agent = self._get_agent_by_type(agent_type)
-        if not agent:
-            raise ValueError(f"No agent available for type: {agent_type}")
-        
         # Add task to agent's queue
         agent.task_queue.append(task)
         self.tasks[task.id] = task
+        self.pending_tasks += 1
         
         self.logger.info(f"Created task {task.id} for agent {agent.name}")
         return task.id
     
     async def get_task_status(self, task_id: str) -> Optional[AgentTask]:
         """Get status of a specific task"""
-        return self.tasks.get(task_id)
+        task = self.tasks.get(task_id)
+        if task and task.metadata.get("queued") and task.status not in _TERMINAL_STATUSES:
+            await self._refresh_queued_task(task)
+        return task
+    
+    async def _refresh_queued_task(self, task: AgentTask):
+        """Update a queued task from the job result backend"""
+        # The result backend lookup is a blocking Redis round-trip, so it runs off the event loop
+        state = await asyncio.get_running_loop().run_in_executor(None, task_queue.get_job_state, task.id)
+        status = AgentStatus(state["status"])
+        if status == task.status:
+            return
+        
+        task.status = status
+        if task.status == AgentStatus.COMPLETED:
+            task.output_data = state["result"] or {}
+            task.completed_at = datetime.now()
+        elif task.status == AgentStatus.ERROR:
+            task.error_message = state["error"]
+            task.completed_at = datetime.now()
+        self._publish_task_update(task)
+    
+    def subscribe_task(self, task_id: str) -> asyncio.Queue:
+        """Register a listener that receives a status snapshot on each update of a task"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self.task_subscribers.setdefault(task_id, set()).add(queue)
+        return queue
+    
+    def unsubscribe_task(self, task_id: str, queue: asyncio.Queue):
+        """Remove a listener registered with subscribe_task"""
+        subscribers = self.task_subscribers.get(task_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self.task_subscribers[task_id]
+    
+    def _publish_task_update(self, task: AgentTask):
+        """Push the task's current status to all of its listeners"""
+        subscribers = self.task_subscribers.get(task.id)
+        if not subscribers:
+            return
+        
+        snapshot = task_snapshot(task)
+        for queue in subscribers:
+            queue.put_nowait(snapshot)
+    
+    async def run_task(self, agent_type: AgentType, task: AgentTask) -> Dict[str, Any]:
+        """Execute a task immediately on an agent of the given type (used by queue workers)"""
+        agent = self._get_agent_by_type(agent_type)
+        if not agent:
+            raise ValueError(f"No agent available for type: {agent_type}")
+        
+        return await self._execute_agent_task(agent, task)
     
     async def get_agent_status(self, agent_id: str) -> Optional[Agent]:
         """Get status of a specific agent"""
@@ -246,12 +408,177 @@ class AgentManager:
         """List all registered agents"""
         return list(self.agents.values())
     
-    async def list_tasks(self, status: Optional[AgentStatus] = None) -> List[AgentTask]:
-        """List tasks, optionally filtered by status"""
-        tasks = list(self.tasks.values())
+    async def iter_agents(self) -> AsyncIterator[Agent]:
+        """Yield registered agents one at a time"""
+        # Iterate a snapshot of references so registrations during a slow consumer are safe
+        for agent in tuple(self.agents.values()):
+            yield agent
+    
+    async def list_tasks(
+        self,
+        status: Optional[AgentStatus] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[AgentTask]:
+        """List tasks, optionally filtered by status, materializing only the requested page"""
+        tasks = self.tasks.values()
         if status:
-            tasks = [task for task in tasks if task.status == status]
-        return tasks
+            tasks = (task for task in tasks if task.status == status)
+        stop = offset + limit if limit is not None else None
+        return list(islice(tasks, offset, stop))
+    
+    async def create_session(
+        self,
+        project_id: str,
+        user_id: str,
+        session_type: str,
+        requirements: Dict[str, Any]
+    ) -> str:
+        """Create a session and submit the task that starts its workflow"""
+        agent_type, task_type = SESSION_ENTRY_TASKS.get(session_type, DEFAULT_SESSION_ENTRY_TASK)
+        session = AgentSession(
+            project_id=project_id,
+            user_id=user_id,
+            session_type=session_type,
+            requirements=requirements
+        )
+        
+        # Submitted before the session is stored, so a saturated queue leaves no empty session behind
+        task_id = await self.create_task(
+            agent_type=agent_type,
+            task_type=task_type,
+            description=f"{session_type} session for project {project_id}",
+            input_data={**requirements, "requirements": requirements, "project_id": project_id}
+        )
+        session.task_ids.append(task_id)
+        self.tasks[task_id].metadata["session_id"] = session.id
+        self.sessions[session.id] = session
+        
+        self.logger.info(f"Created {session_type} session {session.id} for project {project_id}")
+        return session.id
+    
+    def _get_session(self, session_id: str, user_id: Optional[str] = None) -> AgentSession:
+        """Look up a session, treating another user's session as missing"""
+        session = self.sessions.get(session_id)
+        if session is None or (user_id is not None and session.user_id != user_id):
+            raise ValueError(f"Session not found: {session_id}")
+        return session
+    
+    async def get_session_status(self, session_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Summarize a session's progress from the current state of its tasks"""
+        session = self._get_session(session_id, user_id)
+        
+        tasks = []
+        for task_id in session.task_ids:
+            task = await self.get_task_status(task_id)
+            if task is not None:
+                tasks.append(task)
+        
+        completed = sum(1 for task in tasks if task.status == AgentStatus.COMPLETED)
+        failed = sum(1 for task in tasks if task.status == AgentStatus.ERROR)
+        finished = completed + failed
+        
+        if session.cancelled:
+            status = "cancelled"
+        elif tasks and finished == len(tasks):
+            status = "failed" if failed else "completed"
+        else:
+            status = "running"
+        
+        updated_at = max(
+            [session.updated_at] + [task.completed_at or task.started_at or task.created_at for task in tasks]
+        )
+        
+        return {
+            "session_id": session.id,
+            "status": status,
+            "progress": finished / len(tasks) if tasks else 0.0,
+            "total_tasks": len(tasks),
+            "completed_tasks": completed,
+            "failed_tasks": failed,
+            "tasks": [task_snapshot(task) for task in tasks],
+            "updated_at": updated_at.isoformat()
+        }
+    
+    async def cancel_session(self, session_id: str, user_id: Optional[str] = None):
+        """Cancel a session, dropping its tasks that have not started yet"""
+        session = self._get_session(session_id, user_id)
+        session.cancelled = True
+        session.updated_at = datetime.now()
+        
+        waiting = {
+            task_id for task_id in session.task_ids
+            if task_id in self.tasks and self.tasks[task_id].status == AgentStatus.IDLE
+        }
+        if not waiting:
+            return
+        
+        # In-process tasks are pulled out of their agent queues; queued ones are revoked on the workers
+        for agent in self.agents.values():
+            if agent.task_queue:
+                kept = [task for task in agent.task_queue if task.id not in waiting]
+                self.pending_tasks -= len(agent.task_queue) - len(kept)
+                agent.task_queue = kept
+        
+        loop = asyncio.get_running_loop()
+        for task_id in waiting:
+            task = self.tasks[task_id]
+            if task.metadata.get("queued"):
+                await loop.run_in_executor(None, task_queue.revoke_job, task_id)
+            task.status = AgentStatus.ERROR
+            task.error_message = SESSION_CANCELLED_MESSAGE
+            task.completed_at = datetime.now()
+            self._publish_task_update(task)
+        
+        self.logger.info(f"Cancelled session {session_id} ({len(waiting)} waiting tasks dropped)")
+    
+    async def get_task_result(self, session_id: str, task_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the current result of one of a session's tasks"""
+        session = self._get_session(session_id, user_id)
+        task = await self.get_task_status(task_id) if task_id in session.task_ids else None
+        if task is None:
+            raise ValueError(f"Task not found in session {session_id}: {task_id}")
+        return task_snapshot(task)
+    
+    async def get_user_task(self, task_id: str, user_id: str) -> AgentTask:
+        """Look up a task through its session, treating another user's task as missing"""
+        task = self.tasks.get(task_id)
+        session = self.sessions.get(task.metadata.get("session_id")) if task else None
+        if session is None or session.user_id != user_id:
+            raise ValueError(f"Task not found: {task_id}")
+        return await self.get_task_status(task_id)
+    
+    def _is_session_active(self, session: AgentSession) -> bool:
+        """A session is active until it is cancelled or all of its tasks have finished"""
+        if session.cancelled:
+            return False
+        return any(
+            task_id in self.tasks and self.tasks[task_id].status not in _TERMINAL_STATUSES
+            for task_id in session.task_ids
+        )
+    
+    async def get_active_sessions(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        user_id: Optional[str] = None
+    ) -> Tuple[List[str], int]:
+        """Return a page of active session ids, optionally for one user, and the total number of matches"""
+        page: List[str] = []
+        total = 0
+        stop = offset + limit if limit is not None else None
+        
+        # One pass: count every match but keep only the ids inside the requested window
+        for session in self.sessions.values():
+            if user_id is not None and session.user_id != user_id:
+                continue
+            if not self._is_session_active(session):
+                continue
+            if total >= offset and (stop is None or total < stop):
+                page.append(session.id)
+            total += 1
+        
+        return page, total
     
     def _get_agent_by_type(self, agent_type: AgentType) -> Optional[Agent]:
         """Find an agent by type"""
@@ -282,10 +609,12 @@ class AgentManager:
             return
         
         task = agent.task_queue.pop(0)
+        self.pending_tasks -= 1
         agent.current_task = task
         agent.status = AgentStatus.RUNNING
         task.status = AgentStatus.RUNNING
         task.started_at = datetime.now()
+        self._publish_task_update(task)
         
         self.logger.info(f"Agent {agent.name} starting task {task.id}: {task.description}")
         
@@ -300,6 +629,7 @@ class AgentManager:
             agent.status = AgentStatus.IDLE
             agent.current_task = None
             agent.last_active = datetime.now()
+            self._publish_task_update(task)
             
             self.logger.info(f"Task {task.id} completed successfully")
             
@@ -310,6 +640,7 @@ class AgentManager:
             task.completed_at = datetime.now()
             agent.status = AgentStatus.IDLE
             agent.current_task = None
+            self._publish_task_update(task)
             
             self.logger.error(f"Task {task.id} failed: {e}")
     
@@ -647,6 +978,29 @@ class AgentManager:
         else:
             return AgentType.ORCHESTRATOR
     
+    async def refresh_status_snapshot(self) -> bytes:
+        """Rebuild the serialized status snapshot and the matching gauges"""
+        status = await self.get_status()
+        self.status_snapshot = orjson.dumps(status)
+        
+        if metrics_collector is not None:
+            agent_counts = dict.fromkeys(AGENT_STATUS_VALUES, 0)
+            for agent in status["agents"].values():
+                agent_counts[agent["status"]] += 1
+            task_counts = {k: v for k, v in status["tasks"].items() if k != "total"}
+            metrics_collector.update_agent_status(agent_counts, task_counts)
+        
+        return self.status_snapshot
+    
+    async def _status_snapshot_loop(self):
+        """Refresh the status snapshot until the manager stops"""
+        while self.running:
+            try:
+                await self.refresh_status_snapshot()
+            except Exception as e:
+                self.logger.error(f"Error refreshing status snapshot: {e}")
+            await asyncio.sleep(STATUS_SNAPSHOT_INTERVAL)
+    
     async def get_status(self) -> Dict[str, Any]:
         """Get overall status of the agent system"""
         agent_statuses = {}
@@ -659,19 +1013,21 @@ class AgentManager:
                 "last_active": agent.last_active.isoformat()
             }
         
+        # One pass over the task table instead of one filtered list per status
+        status_counts = Counter(task.status for task in self.tasks.values())
         task_summary = {
             "total": len(self.tasks),
-            "idle": len([t for t in self.tasks.values() if t.status == AgentStatus.IDLE]),
-            "running": len([t for t in self.tasks.values() if t.status == AgentStatus.RUNNING]),
-            "completed": len([t for t in self.tasks.values() if t.status == AgentStatus.COMPLETED]),
-            "error": len([t for t in self.tasks.values() if t.status == AgentStatus.ERROR])
+            "idle": status_counts[AgentStatus.IDLE],
+            "running": status_counts[AgentStatus.RUNNING],
+            "completed": status_counts[AgentStatus.COMPLETED],
+            "error": status_counts[AgentStatus.ERROR]
         }
         
         return {
             "system_status": "running" if self.running else "stopped",
             "agents": agent_statuses,
             "tasks": task_summary,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now_iso()
         }
 
 # Global instance
@@ -283,6 +283,7 @@ class CacheManager:
             "embedding": "embed:",
             "code_generation": "code:gen:",
             "agent_result": "agent:result:",
+            "generation_response": "gen:resp:",
             "user_session": "user:session:",
             "project_data": "project:"
         }
@@ -513,6 +514,43 @@ class CacheManager:
         
         return None
     
+    async def cache_generation_response(
+        self,
+        request_hash: str,
+        response: Dict[str, Any],
+        ttl: int = 3600
+    ) -> str:
+        """Cache a generation endpoint response keyed by a hash of its request"""
+        key = self._generate_key(
+            self.prefixes["generation_response"],
+            request_hash
+        )
+        
+        cache_data = {
+            "response": response,
+            "cached_at": datetime.now().isoformat()
+        }
+        
+        await self.cache.set(key, cache_data, ttl)
+        return key
+    
+    async def get_generation_response(
+        self,
+        request_hash: str
+    ) -> Optional[Dict[str, Any]]:
+        """Get a cached generation endpoint response"""
+        key = self._generate_key(
+            self.prefixes["generation_response"],
+            request_hash
+        )
+        
+        cached_data = await self.cache.get(key)
+        if cached_data:
+            self.logger.info(f"Cache hit for generation response: {key}")
+            return cached_data.get("response")
+        
+        return None
+    
     async def invalidate_pattern(self, pattern: str) -> int:
         """Invalidate all keys matching pattern"""
         keys = await self.cache.keys(pattern)
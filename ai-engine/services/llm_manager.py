@@ -2,9 +2,10 @@ import asyncio
 import json
 import logging
 import os
+import time
 from typing import Dict, List, Any, Optional, AsyncGenerator
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 
 # LLM Provider imports
@@ -28,6 +29,16 @@ try:
 except ImportError:
     genai = None
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
 class LLMProvider(Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
@@ -35,6 +46,36 @@ class LLMProvider(Enum):
     GOOGLE = "google"
     LOCAL = "local"
 
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+
+# Providers whose native stream is already OpenAI-style SSE and can be forwarded verbatim
+RAW_SSE_PROVIDERS = frozenset({LLMProvider.OPENAI})
+
+# Per-provider probe budget; kept under the callers' overall health check timeout
+PROVIDER_HEALTH_CHECK_TIMEOUT = 4.0
+
+# Failing calls only count against readiness once nothing has succeeded for this long
+READINESS_WINDOW = 120.0
+
+# Provider probes run on this interval in the background, not per request
+PROVIDER_HEALTH_REFRESH_INTERVAL = 30.0
+
+# Model-list endpoints used as provider probes: they exercise reachability and the API key without billing a generation
+PROVIDER_PROBE_URLS = {
+    LLMProvider.OPENAI: "https://api.openai.com/v1/models",
+    LLMProvider.ANTHROPIC: "https://api.anthropic.com/v1/models",
+    LLMProvider.GOOGLE: "https://generativelanguage.googleapis.com/v1beta/models",
+}
+ANTHROPIC_API_VERSION = "2023-06-01"
+
+# Probe failures that describe the account rather than the provider
+PROBE_STATUS_CODES = {
+    401: "invalid_key",
+    402: "insufficient_credits",
+    403: "invalid_key",
+    429: "rate_limited",
+}
+
 @dataclass
 class LLMConfig:
     provider: LLMProvider
@@ -60,16 +101,57 @@ class LLMManager:
         self.providers = {}
         self.default_provider = LLMProvider.LOCAL  # Start with local/stub
         self.configs = {}
+        # Keep-alive client for provider HTTP calls, normally attached by the application lifespan
+        self.http_client = None
+        self._owns_http_client = False
+        self._openai_client = None
+        # Event loop the cached clients were created on; their connections cannot be used from another
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Outcome timestamps of real generation calls, used as a free readiness signal
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        # Last provider health report, kept warm by a background task
+        self.health_snapshot: Optional[Dict[str, Any]] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._health_refresh: Optional[asyncio.Task] = None
         self._initialize_providers()
     
-    async def initialize(self):
+    async def initialize(self, http_client=None):
         """Initialize the LLM Manager"""
+        if http_client is not None:
+            self.attach_http_client(http_client)
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_refresh_loop())
         self.logger.info("LLM Manager initialized")
+    
+    def attach_http_client(self, client):
+        """Route provider calls through a shared client owned by the caller"""
+        self.http_client = client
+        self._owns_http_client = False
+        self._openai_client = None
         
     async def cleanup(self):
         """Cleanup resources"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await self.close_http_clients()
+        self.http_client = None
         self.logger.info("LLM Manager cleanup completed")
     
+    async def close_http_clients(self):
+        """Close the clients this manager created itself; an attached client is closed by its owner"""
+        if self.http_client is not None and self._owns_http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+            self._owns_http_client = False
+        self._openai_client = None
+        self._client_loop = None
+    
     def _initialize_providers(self):
         """Initialize available LLM providers"""
         
@@ -158,22 +240,29 @@ class LLMManager:
         full_prompt = self._build_prompt(prompt, context)
         
         try:
-            if provider == LLMProvider.OPENAI:
-                return await self._generate_openai(full_prompt, config)
-            elif provider == LLMProvider.ANTHROPIC:
-                return await self._generate_anthropic(full_prompt, config)
-            elif provider == LLMProvider.COHERE:
-                return await self._generate_cohere(full_prompt, config)
-            elif provider == LLMProvider.GOOGLE:
-                return await self._generate_google(full_prompt, config)
-            elif provider == LLMProvider.LOCAL:
-                return await self._generate_stub(full_prompt, config)
-            else:
-                raise ValueError(f"Unsupported provider: {provider}")
-        
+            response = await self._generate_with(provider, full_prompt, config)
         except Exception as e:
+            self.last_failure_at = time.time()
             self.logger.error(f"LLM generation failed with {provider}: {str(e)}")
             raise
+        
+        self.last_success_at = time.time()
+        return response
+    
+    async def _generate_with(self, provider: LLMProvider, prompt: str, config: LLMConfig) -> LLMResponse:
+        """Call one provider, without the readiness bookkeeping of generate()"""
+        if provider == LLMProvider.OPENAI:
+            return await self._generate_openai(prompt, config)
+        elif provider == LLMProvider.ANTHROPIC:
+            return await self._generate_anthropic(prompt, config)
+        elif provider == LLMProvider.COHERE:
+            return await self._generate_cohere(prompt, config)
+        elif provider == LLMProvider.GOOGLE:
+            return await self._generate_google(prompt, config)
+        elif provider == LLMProvider.LOCAL:
+            return await self._generate_stub(prompt, config)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
     
     async def generate_stream(
         self,
@@ -210,6 +299,76 @@ class LLMManager:
             self.logger.error(f"Streaming generation failed with {provider}: {str(e)}")
             raise
     
+    def supports_raw_stream(self, provider: Optional[LLMProvider] = None) -> bool:
+        """Whether a provider's stream can be passed through as OpenAI-format SSE bytes"""
+        provider = provider or self.default_provider
+        return httpx is not None and provider in RAW_SSE_PROVIDERS and provider in self.providers
+    
+    async def generate_stream_raw(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        provider: Optional[LLMProvider] = None,
+        **kwargs
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream the provider's SSE bytes untouched, framing included"""
+        
+        provider = provider or self.default_provider
+        if not self.supports_raw_stream(provider):
+            raise ValueError(f"Provider {provider} does not support raw streaming")
+        
+        config = self.configs[provider]
+        payload = {
+            "model": config.model,
+            "messages": [{"role": "user", "content": self._build_prompt(prompt, context)}],
+            "max_tokens": kwargs.get("max_tokens") or config.max_tokens,
+            "temperature": kwargs.get("temperature", config.temperature),
+            "stream": True
+        }
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            # aiter_raw() skips content decoding, so ask for an uncompressed body
+            "Accept-Encoding": "identity"
+        }
+        
+        async with self._get_http_client().stream("POST", OPENAI_CHAT_COMPLETIONS_URL, json=payload, headers=headers) as response:
+            if response.status_code >= 400:
+                body = await response.aread()
+                raise RuntimeError(f"Raw stream from {provider.value} failed with {response.status_code}: {body[:200]!r}")
+            async for chunk in response.aiter_raw():
+                yield chunk
+    
+    def _check_client_loop(self):
+        """Forget cached clients created on another event loop, e.g. by a previous queue worker job"""
+        loop = asyncio.get_running_loop()
+        if self._client_loop is loop:
+            return
+        if self._owns_http_client:
+            self.http_client = None
+            self._owns_http_client = False
+        self._openai_client = None
+        self._client_loop = loop
+    
+    def _get_http_client(self):
+        """Shared keep-alive HTTP client; created on first use when none was attached"""
+        self._check_client_loop()
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                http2=h2 is not None,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=256, max_keepalive_connections=64)
+            )
+            self._owns_http_client = True
+        return self.http_client
+    
+    def _get_openai_client(self, config: LLMConfig):
+        """One OpenAI client per event loop, reusing the shared connection pool"""
+        self._check_client_loop()
+        if self._openai_client is None:
+            http_client = self._get_http_client() if httpx is not None else None
+            self._openai_client = openai.AsyncOpenAI(api_key=config.api_key, http_client=http_client)
+        return self._openai_client
+    
     def _build_prompt(self, prompt: str, context: Optional[str] = None) -> str:
         """Build the full prompt with context"""
         if not context:
@@ -225,7 +384,7 @@ Please provide a helpful response based on the context above."""
     
     async def _generate_openai(self, prompt: str, config: LLMConfig) -> LLMResponse:
         """Generate using OpenAI"""
-        client = openai.AsyncOpenAI(api_key=config.api_key)
+        client = self._get_openai_client(config)
         
         response = await client.chat.completions.create(
             model=config.model,
@@ -252,7 +411,7 @@ Please provide a helpful response based on the context above."""
     
     async def _stream_openai(self, prompt: str, config: LLMConfig) -> AsyncGenerator[str, None]:
         """Stream using OpenAI"""
-        client = openai.AsyncOpenAI(api_key=config.api_key)
+        client = self._get_openai_client(config)
         
         stream = await client.chat.completions.create(
             model=config.model,
@@ -526,30 +685,126 @@ For now, this stub allows the service to run and be tested without API keys."""
             "usage": response.usage
         }
 
-    async def health_check(self) -> Dict[str, Any]:
-        """Check health of all providers"""
-        health = {}
-        
-        for provider in self.providers:
+    def has_api_key(self, provider: LLMProvider) -> bool:
+        """Whether a provider is registered with credentials"""
+        config = self.configs.get(provider)
+        return config is not None and bool(config.api_key)
+    
+    def is_serving(self, window: float = READINESS_WINDOW) -> bool:
+        """False only while calls keep failing and none has succeeded within the window"""
+        last_success = self.last_success_at or 0.0
+        if self.last_failure_at is None or last_success >= self.last_failure_at:
+            return True
+        now = time.time()
+        # Failures also age out, so a pod taken out of rotation gets retried instead of staying unready
+        return now - last_success < window or now - self.last_failure_at >= window
+    
+    async def current_health(self) -> Dict[str, Any]:
+        """Latest provider health report, probing only if none has been taken yet"""
+        if self.health_snapshot is None:
+            return await self.refresh_health_snapshot()
+        return self.health_snapshot
+    
+    async def refresh_health_snapshot(self) -> Dict[str, Any]:
+        """Probe all providers into the snapshot; concurrent callers share one probe"""
+        if self._health_refresh is None:
+            self._health_refresh = asyncio.create_task(self._probe_health())
+        return await asyncio.shield(self._health_refresh)
+    
+    async def _probe_health(self) -> Dict[str, Any]:
+        try:
+            self.health_snapshot = await self.health_check()
+            return self.health_snapshot
+        finally:
+            self._health_refresh = None
+    
+    async def _health_refresh_loop(self):
+        """Keep the provider health snapshot warm until cancelled"""
+        while True:
             try:
-                # Simple test generation
-                response = await self.generate(
-                    "Say 'OK'", 
-                    provider=provider,
-                    max_tokens=10
-                )
-                health[provider.value] = {
-                    "status": "healthy",
-                    "model": self.configs[provider].model,
-                    "response_length": len(response.content)
-                }
+                await self.refresh_health_snapshot()
             except Exception as e:
-                health[provider.value] = {
-                    "status": "error",
-                    "error": str(e)
-                }
+                self.logger.error(f"Error refreshing provider health: {e}")
+            await asyncio.sleep(PROVIDER_HEALTH_REFRESH_INTERVAL)
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Check health of all providers concurrently"""
+        providers = list(self.providers)
+        results = await asyncio.gather(
+            *(self._check_provider(provider) for provider in providers),
+            return_exceptions=True
+        )
+        # One probe raising must not discard the reports of the others
+        return {
+            provider.value: {"status": "error", "error": str(result)} if isinstance(result, Exception) else result
+            for provider, result in zip(providers, results)
+        }
+    
+    def _probe_headers(self, provider: LLMProvider) -> Dict[str, str]:
+        """Authentication headers for a provider's model-list probe"""
+        api_key = self.configs[provider].api_key
+        if provider == LLMProvider.ANTHROPIC:
+            return {"x-api-key": api_key, "anthropic-version": ANTHROPIC_API_VERSION}
+        if provider == LLMProvider.GOOGLE:
+            return {"x-goog-api-key": api_key}
+        return {"Authorization": f"Bearer {api_key}"}
+    
+    async def _check_provider(self, provider: LLMProvider) -> Dict[str, Any]:
+        """Probe one provider, listing its models where it has a list endpoint"""
+        url = PROVIDER_PROBE_URLS.get(provider)
+        if url is None or httpx is None:
+            return await self._check_provider_generation(provider)
         
-        return health
+        try:
+            async with asyncio.timeout(PROVIDER_HEALTH_CHECK_TIMEOUT):
+                response = await self._get_http_client().get(url, headers=self._probe_headers(provider))
+        except asyncio.TimeoutError:
+            return {
+                "status": "timeout",
+                "error": f"No response within {PROVIDER_HEALTH_CHECK_TIMEOUT}s"
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+        
+        if response.status_code == 200:
+            return {
+                "status": "healthy",
+                "model": self.configs[provider].model
+            }
+        return {
+            "status": PROBE_STATUS_CODES.get(response.status_code, "error"),
+            "error": f"Model list request returned HTTP {response.status_code}"
+        }
+    
+    async def _check_provider_generation(self, provider: LLMProvider) -> Dict[str, Any]:
+        """Probe one provider with a minimal generation"""
+        try:
+            # Called below generate() so probes neither count as real traffic for readiness
+            # nor leave their token cap on the provider's shared config
+            async with asyncio.timeout(PROVIDER_HEALTH_CHECK_TIMEOUT):
+                response = await self._generate_with(
+                    provider,
+                    "Say 'OK'",
+                    replace(self.configs[provider], max_tokens=10)
+                )
+            return {
+                "status": "healthy",
+                "model": self.configs[provider].model,
+                "response_length": len(response.content)
+            }
+        except asyncio.TimeoutError:
+            return {
+                "status": "timeout",
+                "error": f"No response within {PROVIDER_HEALTH_CHECK_TIMEOUT}s"
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "error": str(e)
+            }
 
 # Global instance
 llm_manager = LLMManager()
\ No newline at end of file
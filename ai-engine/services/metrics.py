@@ -2,13 +2,22 @@
 Prometheus metrics for AI Engine service
 """
 from prometheus_client import Counter, Histogram, Gauge, Info, CollectorRegistry, generate_latest
+import asyncio
 import time
 from typing import Dict, Any, Optional
 from functools import wraps
 import logging
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 logger = logging.getLogger(__name__)
 
+# psutil reads /proc, so resources are sampled on this interval off the event loop, never per request
+RESOURCE_SAMPLE_INTERVAL = 5.0
+
 # Create a custom registry for our metrics
 registry = CollectorRegistry()
 
@@ -85,6 +94,38 @@ agent_sessions_total = Counter(
     registry=registry
 )
 
+agents_by_status = Gauge(
+    'myco_ai_engine_agents_by_status',
+    'Number of registered agents in each status',
+    ['status'],
+    registry=registry
+)
+
+agent_tasks_by_status = Gauge(
+    'myco_ai_engine_agent_tasks_by_status',
+    'Number of agent tasks in each status',
+    ['status'],
+    registry=registry
+)
+
+generation_inflight_requests = Gauge(
+    'myco_ai_engine_generation_inflight_requests',
+    'Generation requests currently holding an admission slot',
+    registry=registry
+)
+
+generation_admission_rejections_total = Counter(
+    'myco_ai_engine_generation_admission_rejections_total',
+    'Generation requests rejected because no admission slot freed up in time',
+    registry=registry
+)
+
+event_loop_tasks = Gauge(
+    'myco_ai_engine_event_loop_tasks',
+    'Pending asyncio tasks on the event loop, sampled by the background sampler',
+    registry=registry
+)
+
 agent_messages_total = Counter(
     'myco_ai_engine_agent_messages_total',
     'Total number of agent messages',
@@ -122,6 +163,20 @@ provider_health = Gauge(
     registry=registry
 )
 
+provider_response_time_seconds = Gauge(
+    'myco_ai_engine_provider_response_time_seconds',
+    'Response time of the last provider health probe in seconds',
+    ['provider'],
+    registry=registry
+)
+
+provider_error_rate = Gauge(
+    'myco_ai_engine_provider_error_rate',
+    'Estimated provider error rate (0-1) from health probes and recorded errors',
+    ['provider'],
+    registry=registry
+)
+
 provider_rate_limit_remaining = Gauge(
     'myco_ai_engine_provider_rate_limit_remaining',
     'Remaining rate limit for LLM providers',
@@ -218,9 +273,58 @@ class MetricsCollector:
     
     def __init__(self):
         self.registry = registry
+        # Latest process/host resource sample, refreshed by the background sampler
+        self.resource_snapshot: Dict[str, Any] = {}
+        self._process = psutil.Process() if psutil is not None else None
+        self._sampler_task: Optional[asyncio.Task] = None
         # Initialize provider health as unknown
         self._init_provider_health()
     
+    def start_resource_sampler(self):
+        """Start sampling event-loop tasks, and resource usage when psutil is installed, in the background"""
+        if self._sampler_task is None:
+            if self._process is not None:
+                # Prime cpu_percent so the first real sample measures an interval instead of returning 0.0
+                self._process.cpu_percent(interval=None)
+            self._sampler_task = asyncio.create_task(self._resource_sampler_loop())
+    
+    async def stop_resource_sampler(self):
+        """Stop the background resource sampler"""
+        if self._sampler_task is not None:
+            self._sampler_task.cancel()
+            try:
+                await self._sampler_task
+            except asyncio.CancelledError:
+                pass
+            self._sampler_task = None
+    
+    def _sample_resources(self) -> Dict[str, Any]:
+        """Take one resource sample; blocking, so it runs in the default executor"""
+        memory = self._process.memory_info()
+        return {
+            "cpu_percent": self._process.cpu_percent(interval=None),
+            "memory_rss_bytes": memory.rss,
+            "system_memory": psutil.virtual_memory()._asdict(),
+            "disk": psutil.disk_usage("/")._asdict(),
+            "sampled_at": time.time()
+        }
+    
+    async def _resource_sampler_loop(self):
+        """Refresh the resource snapshot and gauges until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # all_tasks() walks every task on the loop, so it is sampled here rather than per request
+            event_loop_tasks.set(len(asyncio.all_tasks(loop)))
+            if self._process is not None:
+                try:
+                    sample = await loop.run_in_executor(None, self._sample_resources)
+                    self.resource_snapshot = sample
+                    memory_usage_bytes.set(sample["memory_rss_bytes"])
+                    cpu_usage_percent.set(sample["cpu_percent"])
+                except Exception as e:
+                    logger.error(f"Failed to sample resource usage: {e}")
+            await asyncio.sleep(RESOURCE_SAMPLE_INTERVAL)
+    
     def _init_provider_health(self):
         """Initialize provider health metrics"""
         providers = ['openai', 'anthropic', 'google', 'cohere']
@@ -229,15 +333,16 @@ class MetricsCollector:
     
     def record_http_request(self, method: str, endpoint: str, status_code: int, duration: float):
         """Record HTTP request metrics"""
+        method = method.upper()
         try:
             http_requests_total.labels(
-                method=method.upper(),
+                method=method,
                 endpoint=endpoint,
                 status_code=str(status_code)
             ).inc()
             
             http_request_duration_seconds.labels(
-                method=method.upper(),
+                method=method,
                 endpoint=endpoint
             ).observe(duration)
         except Exception as e:
@@ -295,6 +400,30 @@ class MetricsCollector:
         except Exception as e:
             logger.error(f"Failed to record agent session metrics: {e}")
     
+    def update_agent_status(self, agent_counts: Dict[str, int], task_counts: Dict[str, int]):
+        """Set agent and task gauges from an agent manager status snapshot"""
+        try:
+            for status, count in agent_counts.items():
+                agents_by_status.labels(status=status).set(count)
+            for status, count in task_counts.items():
+                agent_tasks_by_status.labels(status=status).set(count)
+        except Exception as e:
+            logger.error(f"Failed to update agent status metrics: {e}")
+    
+    def update_admission(self, inflight: int):
+        """Set the generation in-flight gauge"""
+        try:
+            generation_inflight_requests.set(inflight)
+        except Exception as e:
+            logger.error(f"Failed to update admission metrics: {e}")
+    
+    def record_admission_rejection(self):
+        """Record a generation request shed by admission control"""
+        try:
+            generation_admission_rejections_total.inc()
+        except Exception as e:
+            logger.error(f"Failed to record admission rejection: {e}")
+    
     def record_agent_message(self, agent_type: str, direction: str):
         """Record agent message metrics"""
         try:
@@ -333,6 +462,14 @@ class MetricsCollector:
         except Exception as e:
             logger.error(f"Failed to update provider health metrics: {e}")
     
+    def update_provider_stats(self, provider: str, response_time: float, error_rate: float):
+        """Update provider probe latency and error rate"""
+        try:
+            provider_response_time_seconds.labels(provider=provider).set(response_time)
+            provider_error_rate.labels(provider=provider).set(error_rate)
+        except Exception as e:
+            logger.error(f"Failed to update provider stats metrics: {e}")
+    
     def update_provider_rate_limit(self, provider: str, remaining: int):
         """Update provider rate limit remaining"""
         try:
@@ -383,9 +520,13 @@ metrics_collector = MetricsCollector()
 
 def track_http_request(func):
     """Decorator to track HTTP request metrics"""
+    # Labels are fixed per endpoint, so they are resolved once at decoration time
+    endpoint = getattr(func, '__name__', 'unknown')
+    method = 'POST'  # Default for FastAPI endpoints
+    
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_time = time.monotonic()
         status_code = 200
         
         try:
@@ -395,11 +536,7 @@ def track_http_request(func):
             status_code = getattr(e, 'status_code', 500)
             raise
         finally:
-            duration = time.time() - start_time
-            # Extract endpoint from function name or args
-            endpoint = getattr(func, '__name__', 'unknown')
-            method = 'POST'  # Default for FastAPI endpoints
-            
+            duration = time.monotonic() - start_time
             metrics_collector.record_http_request(method, endpoint, status_code, duration)
     
     return wrapper
@@ -410,7 +547,7 @@ def track_llm_request(provider: str, model: str):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_time = time.monotonic()
             success = True
             
             try:
@@ -427,7 +564,7 @@ def track_llm_request(provider: str, model: str):
                 prompt_tokens = completion_tokens = cost = 0
                 raise
             finally:
-                duration = time.time() - start_time
+                duration = time.monotonic() - start_time
                 metrics_collector.record_llm_request(
                     provider, model, duration, prompt_tokens, completion_tokens, cost, success
                 )
@@ -10,13 +10,31 @@ from enum import Enum
 import asyncio
 from dataclasses import dataclass
 
+try:
+    from .metrics import metrics_collector
+except ImportError:
+    metrics_collector = None
+
 logger = logging.getLogger(__name__)
 
+# llm_manager probe outcomes that leave a provider selectable but degraded; any other failure makes it unavailable
+DEGRADED_PROBE_STATUSES = frozenset({"timeout", "rate_limited"})
+
+# Environment variable holding each provider's API key
+PROVIDER_API_KEY_ENV = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "google": "GOOGLE_API_KEY"
+}
+
 class ProviderHealth(Enum):
     HEALTHY = "healthy"
     DEGRADED = "degraded"
     UNAVAILABLE = "unavailable"
 
+# Health states a provider may still be selected in
+_SELECTABLE_HEALTH = frozenset({ProviderHealth.HEALTHY, ProviderHealth.DEGRADED})
+
 @dataclass
 class ProviderStatus:
     name: str
@@ -33,6 +51,8 @@ class ProviderSelector:
         self.provider_status: Dict[str, ProviderStatus] = {}
         self.health_check_interval = 300  # 5 minutes
         self.last_health_check = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self.reload_api_keys()
         
         # Provider priority order
         self.provider_priority = ["openai", "anthropic", "google"]
@@ -49,18 +69,40 @@ class ProviderSelector:
             "gemini-1.5-pro": ["google"]
         }
         
+    async def initialize(self):
+        """Start refreshing provider health in the background"""
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_refresh_loop())
+    
+    async def cleanup(self):
+        """Stop the background health refresh"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+    
+    async def _health_refresh_loop(self):
+        """Refresh provider health on a fixed interval until cancelled"""
+        while True:
+            try:
+                await self._update_health_status()
+            except Exception as e:
+                logger.error("Error refreshing provider health: %s", e)
+            await asyncio.sleep(self.health_check_interval)
+    
     async def get_best_provider(self, model: str = None, preferred_provider: str = None) -> Optional[str]:
         """Select the best available provider for the request"""
         
-        # Update health status if needed
-        await self._update_health_status()
-        
+        # Health comes from the background snapshot; requests never wait on provider probes
         # If specific provider requested, validate it
         if preferred_provider:
             if self._is_provider_available(preferred_provider):
                 return preferred_provider
             else:
-                logger.warning(f"Preferred provider {preferred_provider} not available")
+                logger.warning("Preferred provider %s not available", preferred_provider)
         
         # If model specified, filter providers that support it
         candidate_providers = []
@@ -72,7 +114,7 @@ class ProviderSelector:
         # Select best available provider
         for provider in candidate_providers:
             if self._is_provider_available(provider):
-                logger.info(f"Selected provider: {provider} for model: {model}")
+                logger.info("Selected provider: %s for model: %s", provider, model)
                 return provider
                 
         logger.error("No available providers found")
@@ -85,39 +127,43 @@ class ProviderSelector:
         if not self._has_api_key(provider):
             return False
             
-        # Check health status
-        if provider in self.provider_status:
-            status = self.provider_status[provider]
-            return status.health in [ProviderHealth.HEALTHY, ProviderHealth.DEGRADED]
-            
-        # Assume available if no status recorded yet
-        return True
-        
+        # Check health status; assume available if no status recorded yet
+        status = self.provider_status.get(provider)
+        return status is None or status.health in _SELECTABLE_HEALTH
+        
+    def reload_api_keys(self):
+        """Re-read which providers have API keys; call after the environment changes"""
+        self._keyed_providers = frozenset(
+            provider for provider, env_var in PROVIDER_API_KEY_ENV.items() if os.getenv(env_var)
+        )
+    
+    @property
+    def configured_providers(self) -> frozenset:
+        """Providers with an API key as of the last reload_api_keys(); replaced, never mutated"""
+        return self._keyed_providers
+    
     def _has_api_key(self, provider: str) -> bool:
         """Check if provider has API key configured"""
-        key_mapping = {
-            "openai": "OPENAI_API_KEY",
-            "anthropic": "ANTHROPIC_API_KEY", 
-            "google": "GOOGLE_API_KEY"
-        }
-        
-        env_var = key_mapping.get(provider)
-        return bool(env_var and os.getenv(env_var))
+        # Keys are read once; this runs for every candidate on every provider selection
+        return provider in self._keyed_providers
         
     async def _update_health_status(self):
         """Update provider health status"""
         
-        current_time = time.time()
-        if current_time - self.last_health_check < self.health_check_interval:
-            return
-            
-        self.last_health_check = current_time
+        self.last_health_check = time.time()
         
-        # Check each provider
-        for provider in self.provider_priority:
-            if self._has_api_key(provider):
-                health_status = await self._check_provider_health(provider)
-                self.provider_status[provider] = health_status
+        # Providers are independent, so they are probed concurrently
+        providers = [provider for provider in self.provider_priority if self._has_api_key(provider)]
+        statuses = await asyncio.gather(*(self._check_provider_health(provider) for provider in providers))
+        for provider, health_status in zip(providers, statuses):
+            self.provider_status[provider] = health_status
+            self._export_status(health_status)
+    
+    def _export_status(self, status: ProviderStatus):
+        """Mirror a provider status into the Prometheus gauges"""
+        if metrics_collector is not None:
+            metrics_collector.update_provider_health(status.name, status.health == ProviderHealth.HEALTHY)
+            metrics_collector.update_provider_stats(status.name, status.response_time, status.error_rate)
                 
     async def _check_provider_health(self, provider: str) -> ProviderStatus:
         """Perform health check on specific provider"""
@@ -128,43 +174,32 @@ class ProviderSelector:
             # Import here to avoid circular imports
             from .llm_manager import llm_manager, LLMProvider
             
-            provider_enum = LLMProvider(provider.upper())
-            
-            # Test simple generation
-            response = await asyncio.wait_for(
-                llm_manager.generate(
-                    prompt="test",
-                    provider=provider_enum,
-                    max_tokens=1
-                ),
-                timeout=10.0
-            )
-            
-            response_time = time.time() - start_time
+            # Model-list probe: checks reachability and the key without billing a generation,
+            # and without counting as real traffic for readiness
+            result = await llm_manager._check_provider(LLMProvider(provider))
+            probe_status = result["status"]
             
-            if response and response.content:
+            if probe_status == "healthy":
                 health = ProviderHealth.HEALTHY
                 error_rate = 0.0
-            else:
+            elif probe_status in DEGRADED_PROBE_STATUSES:
                 health = ProviderHealth.DEGRADED
-                error_rate = 0.5
-                
-        except asyncio.TimeoutError:
-            health = ProviderHealth.DEGRADED
-            response_time = 10.0
-            error_rate = 1.0
-            logger.warning(f"Provider {provider} health check timed out")
+                error_rate = 1.0
+                logger.warning("Provider %s health check degraded: %s", provider, result.get("error", probe_status))
+            else:
+                health = ProviderHealth.UNAVAILABLE
+                error_rate = 1.0
+                logger.error("Provider %s health check failed: %s", provider, result.get("error", probe_status))
             
         except Exception as e:
             health = ProviderHealth.UNAVAILABLE
-            response_time = time.time() - start_time
             error_rate = 1.0
-            logger.error(f"Provider {provider} health check failed: {e}")
-            
+            logger.error("Provider %s health check failed: %s", provider, e)
+        
         return ProviderStatus(
             name=provider,
             health=health,
-            response_time=response_time,
+            response_time=time.time() - start_time,
             error_rate=error_rate,
             last_check=time.time(),
             available_models=self._get_provider_models(provider)
@@ -189,7 +224,8 @@ class ProviderSelector:
             status.error_rate = min(1.0, status.error_rate + 0.1)
             if status.error_rate > 0.5:
                 status.health = ProviderHealth.DEGRADED
-            logger.warning(f"Recorded error for provider {provider}: {error}")
+            self._export_status(status)
+            logger.warning("Recorded error for provider %s: %s", provider, error)
 
 # Global instance
 provider_selector = ProviderSelector()
\ No newline at end of file
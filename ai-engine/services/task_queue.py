@@ -0,0 +1,122 @@
+"""
+Out-of-process job queue for agent task execution
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+try:
+    from celery import Celery
+    from celery.result import AsyncResult
+except ImportError:
+    Celery = None
+    AsyncResult = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from .llm_manager import llm_manager
+
+logger = logging.getLogger(__name__)
+
+AGENT_QUEUE = "agents"
+AGENT_TASK_NAME = "agents.execute_agent_task"
+
+# Celery/Redis priorities: lower numbers are consumed first
+TASK_PRIORITIES = {"high": 1, "normal": 5, "low": 9}
+
+# Celery result states mapped onto agent task statuses
+JOB_STATES = {
+    "PENDING": "idle",
+    "RECEIVED": "idle",
+    "STARTED": "running",
+    "RETRY": "running",
+    "SUCCESS": "completed",
+    "FAILURE": "error",
+    "REVOKED": "error",
+}
+
+def _create_celery_app() -> Optional["Celery"]:
+    """Create the Celery app when the celery backend is selected and installed"""
+    if os.getenv("AGENT_TASK_BACKEND", "local").lower() != "celery":
+        return None
+
+    if Celery is None:
+        logger.warning("AGENT_TASK_BACKEND=celery but celery is not installed; running agent tasks in-process")
+        return None
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    app = Celery("agents", broker=redis_url, backend=redis_url)
+    app.conf.update(
+        task_default_queue=AGENT_QUEUE,
+        task_acks_late=True,
+        task_time_limit=int(os.getenv("AGENT_TIMEOUT", "300")),
+        worker_prefetch_multiplier=1,
+        task_serializer="json",
+        result_serializer="json",
+        accept_content=["json"],
+    )
+    return app
+
+def _run(coro):
+    """Run a coroutine to completion, on uvloop when available"""
+    # Worker processes are not started by uvicorn, so its --loop uvloop flag does not apply here
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None) as runner:
+        try:
+            return runner.run(coro)
+        finally:
+            # Provider clients opened during the job are bound to this loop, which closes with the runner
+            runner.run(llm_manager.close_http_clients())
+
+# Workers are started with:
+#   celery -A services.task_queue worker -Q agents --concurrency=8 --prefetch-multiplier=1
+celery_app = _create_celery_app()
+
+if celery_app is not None:
+
+    @celery_app.task(name=AGENT_TASK_NAME, bind=True, acks_late=True)
+    def execute_agent_task(self, agent_type: str, task_type: str, description: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single agent task inside a Celery worker"""
+        from .agent_manager import agent_manager, AgentTask, AgentType
+
+        task = AgentTask(id=self.request.id, type=task_type, description=description, input_data=input_data)
+        return _run(agent_manager.run_task(AgentType(agent_type), task))
+
+def is_enabled() -> bool:
+    """Whether agent tasks are dispatched to the Celery queue"""
+    return celery_app is not None
+
+def enqueue_agent_task(
+    agent_type: str,
+    task_type: str,
+    description: str,
+    input_data: Dict[str, Any],
+    priority: str = "normal"
+) -> str:
+    """Enqueue an agent task on the worker pool and return its job id"""
+    result = execute_agent_task.apply_async(
+        args=[agent_type, task_type, description, input_data],
+        queue=AGENT_QUEUE,
+        priority=TASK_PRIORITIES.get(priority, TASK_PRIORITIES["normal"]),
+    )
+    return result.id
+
+def get_job_state(job_id: str) -> Dict[str, Any]:
+    """Look up the state of a queued job in the result backend"""
+    result = AsyncResult(job_id, app=celery_app)
+    state = {"status": JOB_STATES.get(result.state, "running"), "result": None, "error": None}
+
+    if result.successful():
+        state["result"] = result.result
+    elif result.failed():
+        state["error"] = str(result.result)
+
+    return state
+
+def revoke_job(job_id: str):
+    """Revoke a queued job so workers skip it"""
+    celery_app.control.revoke(job_id)
@@ -0,0 +1,164 @@
+"""
+Tests for agent sessions
+"""
+
+import pytest
+from unittest.mock import patch
+
+from services import task_queue
+from services.agent_manager import AgentManager, AgentSession, AgentStatus, AgentTask, AgentType, SESSION_CANCELLED_MESSAGE
+from core.exceptions import AgentCapacityError
+
+def add_session(manager: AgentManager, session_id: str, user_id: str = "user-1", status: AgentStatus = AgentStatus.IDLE) -> AgentSession:
+    task = AgentTask(status=status)
+    manager.tasks[task.id] = task
+    session = AgentSession(id=session_id, project_id="project-1", user_id=user_id, session_type="code_review", task_ids=[task.id])
+    manager.sessions[session.id] = session
+    return session
+
+class TestActiveSessions:
+    """Test paging of active sessions"""
+    
+    @pytest.fixture
+    def agent_manager(self):
+        return AgentManager()
+    
+    @pytest.mark.asyncio
+    async def test_pages_and_counts_active_sessions(self, agent_manager):
+        """Only the requested window is returned, the total counts every match"""
+        for i in range(5):
+            add_session(agent_manager, f"s{i}")
+        
+        page, total = await agent_manager.get_active_sessions(limit=2, offset=1)
+        
+        assert page == ["s1", "s2"]
+        assert total == 5
+    
+    @pytest.mark.asyncio
+    async def test_finished_and_cancelled_sessions_are_not_active(self, agent_manager):
+        """Sessions whose tasks all finished or that were cancelled are skipped"""
+        add_session(agent_manager, "running")
+        add_session(agent_manager, "done", status=AgentStatus.COMPLETED)
+        add_session(agent_manager, "failed", status=AgentStatus.ERROR)
+        add_session(agent_manager, "cancelled").cancelled = True
+        
+        assert await agent_manager.get_active_sessions() == (["running"], 1)
+    
+    @pytest.mark.asyncio
+    async def test_filters_by_user(self, agent_manager):
+        """Passing a user id lists only that user's sessions"""
+        add_session(agent_manager, "mine", user_id="user-1")
+        add_session(agent_manager, "theirs", user_id="user-2")
+        
+        assert await agent_manager.get_active_sessions(user_id="user-1") == (["mine"], 1)
+
+class TestSessionLifecycle:
+    """Test creating, inspecting and cancelling sessions"""
+    
+    @pytest.fixture
+    def agent_manager(self):
+        return AgentManager()
+    
+    @pytest.fixture(autouse=True)
+    def in_process(self):
+        with patch.object(task_queue, "is_enabled", return_value=False):
+            yield
+    
+    @pytest.mark.asyncio
+    async def test_create_session_submits_entry_task(self, agent_manager):
+        """The session type picks the agent and task type of the first task"""
+        session_id = await agent_manager.create_session("project-1", "user-1", "code_review", {"codebase": "print(1)"})
+        
+        session = agent_manager.sessions[session_id]
+        task = agent_manager.tasks[session.task_ids[0]]
+        assert task.type == "security_audit"
+        assert task.input_data["codebase"] == "print(1)"
+        assert task.input_data["requirements"] == {"codebase": "print(1)"}
+        assert task in agent_manager._get_agent_by_type(AgentType.SECURITY).task_queue
+        assert agent_manager.pending_tasks == 1
+    
+    @pytest.mark.asyncio
+    async def test_saturated_queue_creates_no_session(self, agent_manager):
+        """A rejected entry task leaves no session behind"""
+        with patch("services.agent_manager.MAX_PENDING_AGENT_TASKS", 0):
+            with pytest.raises(AgentCapacityError):
+                await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        
+        assert agent_manager.sessions == {}
+    
+    @pytest.mark.asyncio
+    async def test_session_status_tracks_tasks(self, agent_manager):
+        """Progress and status follow the session's tasks"""
+        session_id = await agent_manager.create_session("project-1", "user-1", "project_generation", {})
+        status = await agent_manager.get_session_status(session_id, user_id="user-1")
+        assert (status["status"], status["progress"], status["total_tasks"]) == ("running", 0.0, 1)
+        
+        task = agent_manager.tasks[agent_manager.sessions[session_id].task_ids[0]]
+        task.status = AgentStatus.COMPLETED
+        status = await agent_manager.get_session_status(session_id)
+        assert (status["status"], status["progress"], status["completed_tasks"]) == ("completed", 1.0, 1)
+    
+    @pytest.mark.asyncio
+    async def test_other_users_session_is_not_found(self, agent_manager):
+        """A session is invisible to users other than its owner"""
+        session_id = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        task_id = agent_manager.sessions[session_id].task_ids[0]
+        
+        with pytest.raises(ValueError, match="Session not found"):
+            await agent_manager.get_session_status(session_id, user_id="user-2")
+        with pytest.raises(ValueError, match="Session not found"):
+            await agent_manager.get_task_result(session_id, task_id, user_id="user-2")
+        with pytest.raises(ValueError, match="Session not found"):
+            await agent_manager.cancel_session(session_id, user_id="user-2")
+    
+    @pytest.mark.asyncio
+    async def test_user_task_is_scoped_to_session_owner(self, agent_manager):
+        """A task resolves for its session's owner and is missing for everyone else"""
+        session_id = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        task_id = agent_manager.sessions[session_id].task_ids[0]
+        
+        assert (await agent_manager.get_user_task(task_id, user_id="user-1")).id == task_id
+        with pytest.raises(ValueError, match="Task not found"):
+            await agent_manager.get_user_task(task_id, user_id="user-2")
+        with pytest.raises(ValueError, match="Task not found"):
+            await agent_manager.get_user_task("missing", user_id="user-1")
+    
+    @pytest.mark.asyncio
+    async def test_task_result_requires_task_in_session(self, agent_manager):
+        """Only the session's own tasks can be looked up through it"""
+        first = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        second = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        other_task = agent_manager.sessions[second].task_ids[0]
+        
+        with pytest.raises(ValueError, match="Task not found"):
+            await agent_manager.get_task_result(first, other_task)
+    
+    @pytest.mark.asyncio
+    async def test_cancel_drops_waiting_tasks(self, agent_manager):
+        """Cancelling pulls unstarted tasks from the agent queues and marks them failed"""
+        session_id = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        task = agent_manager.tasks[agent_manager.sessions[session_id].task_ids[0]]
+        updates = agent_manager.subscribe_task(task.id)
+        
+        await agent_manager.cancel_session(session_id, user_id="user-1")
+        
+        assert agent_manager.pending_tasks == 0
+        assert all(task not in agent.task_queue for agent in agent_manager.agents.values())
+        assert task.status == AgentStatus.ERROR
+        assert updates.get_nowait()["error"] == SESSION_CANCELLED_MESSAGE
+        status = await agent_manager.get_session_status(session_id)
+        assert status["status"] == "cancelled"
+        assert await agent_manager.get_active_sessions() == ([], 0)
+    
+    @pytest.mark.asyncio
+    async def test_cancel_revokes_queued_tasks(self, agent_manager):
+        """Tasks handed to the job queue are revoked on the workers"""
+        with patch.object(task_queue, "is_enabled", return_value=True), \
+             patch.object(task_queue, "enqueue_agent_task", return_value="job-1"):
+            session_id = await agent_manager.create_session("project-1", "user-1", "debugging", {})
+        
+        with patch.object(task_queue, "revoke_job") as revoke_job:
+            await agent_manager.cancel_session(session_id)
+        
+        revoke_job.assert_called_once_with("job-1")
+        assert agent_manager.tasks["job-1"].status == AgentStatus.ERROR
@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, AsyncMock
 from main import app
+from middleware.body_limit import MAX_REQUEST_BODY_SIZE
 
 class TestGenerationAPI:
     
@@ -30,6 +31,28 @@ class TestGenerationAPI:
         assert "timestamp" in data
         assert "version" in data
     
+    def test_liveness_endpoint(self, client):
+        """Test the liveness probe target used by the container and Kubernetes probes"""
+        response = client.get("/live")
+        assert response.status_code == 204
+        assert response.content == b""
+    
+    def test_probes_follow_reloaded_api_keys(self, client, monkeypatch):
+        """Test that keys picked up by reload_api_keys show up in the probe bodies"""
+        from main import provider_selector
+        
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        provider_selector.reload_api_keys()
+        assert client.get("/ready").json()["configured_providers"]["google"] is False
+        
+        monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+        provider_selector.reload_api_keys()
+        assert client.get("/ready").json()["configured_providers"]["google"] is True
+        assert client.get("/healthz").json()["status"] == "healthy"
+        
+        monkeypatch.delenv("GOOGLE_API_KEY")
+        provider_selector.reload_api_keys()
+    
     def test_models_endpoint(self, client, mock_llm_manager):
         """Test models list endpoint"""
         with patch('api.routes.generation.llm_manager', mock_llm_manager):
@@ -369,4 +392,48 @@ class TestGenerationAPI:
             thread.join()
         
         # All requests should succeed
-        assert all(status == 200 for status in results)
\ No newline at end of file
+        assert all(status == 200 for status in results)
+class TestRequestBodyLimit:
+    """Test rejection of oversize generation bodies before they are parsed"""
+    
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+    
+    def test_declared_length_over_limit_is_rejected(self, client):
+        """A Content-Length above the limit is answered with 413 without reading the body"""
+        response = client.post(
+            "/generation",
+            content=b"x" * (MAX_REQUEST_BODY_SIZE + 1),
+            headers={"Content-Type": "application/json"}
+        )
+        
+        assert response.status_code == 413
+        assert response.json()["error"] == "Request body too large"
+    
+    def test_chunked_body_over_limit_is_rejected(self, client):
+        """A body sent without Content-Length is counted as it arrives and cut off at the limit"""
+        def chunks():
+            for _ in range(MAX_REQUEST_BODY_SIZE // 65536 + 2):
+                yield b"x" * 65536
+        
+        response = client.post("/generation", content=chunks(), headers={"Content-Type": "application/json"})
+        
+        assert "content-length" not in response.request.headers
+        assert response.status_code == 413
+    
+    def test_body_within_limit_reaches_the_handler(self, client):
+        """Bodies under the limit are parsed and validated as usual"""
+        response = client.post("/generation", json={"prompt": ""})
+        
+        assert response.status_code == 422
+    
+    def test_other_paths_are_not_limited(self, client):
+        """Paths outside the generation prefixes are left alone"""
+        response = client.post(
+            "/chat",
+            content=b"x" * (MAX_REQUEST_BODY_SIZE + 1),
+            headers={"Content-Type": "application/json"}
+        )
+        
+        assert response.status_code != 413
@@ -1,4 +1,5 @@
 import pytest
+import time
 from unittest.mock import Mock, patch, AsyncMock
 from services.llm_manager import LLMManager, LLMProvider
 from core.exceptions import LLMError, RateLimitError
@@ -300,4 +301,43 @@ class TestLLMManager:
             
             assert len(results) == 5
             assert all(result == "Concurrent response" for result in results)
-            assert mock_completion.call_count == 5
\ No newline at end of file
+            assert mock_completion.call_count == 5
+
+
+class TestReadinessSignal:
+    """Test that readiness follows real traffic only"""
+    
+    @pytest.fixture
+    def llm_manager(self):
+        return LLMManager()
+    
+    @pytest.mark.asyncio
+    async def test_health_check_does_not_mark_serving(self, llm_manager):
+        """Background probes must not hide failing traffic from /ready"""
+        now = time.time()
+        llm_manager.last_success_at = now - 300
+        llm_manager.last_failure_at = now
+        assert llm_manager.is_serving() is False
+        
+        await llm_manager.health_check()
+        
+        assert (llm_manager.last_success_at, llm_manager.last_failure_at) == (now - 300, now)
+        assert llm_manager.is_serving() is False
+    
+    @pytest.mark.asyncio
+    async def test_generation_probe_leaves_config_untouched(self, llm_manager):
+        """The probe's token cap applies to the probe only"""
+        max_tokens = llm_manager.configs[LLMProvider.LOCAL].max_tokens
+        
+        result = await llm_manager._check_provider_generation(LLMProvider.LOCAL)
+        
+        assert result["status"] == "healthy"
+        assert llm_manager.configs[LLMProvider.LOCAL].max_tokens == max_tokens
+    
+    @pytest.mark.asyncio
+    async def test_generate_records_outcome(self, llm_manager):
+        """Real generations still drive the readiness timestamps"""
+        await llm_manager.generate("hello", provider=LLMProvider.LOCAL)
+        
+        assert llm_manager.last_success_at is not None
+        assert llm_manager.is_serving() is True
@@ -343,7 +343,7 @@ class TestRecoveryMechanisms:
         manager = LLMManager()
         
         # Simulate failures in health check
-        with patch.object(manager, 'generate') as mock_gen:
+        with patch.object(manager, '_generate_with') as mock_gen:
             mock_gen.side_effect = Exception("Health check failed")
             
             health = await manager.health_check()
@@ -0,0 +1,54 @@
+"""
+Tests for provider health refresh in the provider selector
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services.llm_manager import llm_manager, LLMProvider
+from services.provider_selector import ProviderSelector, ProviderHealth
+
+class TestProviderHealthCheck:
+    """Test mapping of model-list probe results onto provider health"""
+    
+    @pytest.fixture
+    def selector(self):
+        return ProviderSelector()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("probe_status, expected", [
+        ("healthy", ProviderHealth.HEALTHY),
+        ("timeout", ProviderHealth.DEGRADED),
+        ("rate_limited", ProviderHealth.DEGRADED),
+        ("invalid_key", ProviderHealth.UNAVAILABLE),
+        ("insufficient_credits", ProviderHealth.UNAVAILABLE),
+        ("error", ProviderHealth.UNAVAILABLE),
+    ])
+    async def test_probe_status_maps_to_health(self, selector, probe_status, expected):
+        """Each probe outcome maps onto a provider health state"""
+        probe = AsyncMock(return_value={"status": probe_status})
+        with patch.object(llm_manager, "_check_provider", probe):
+            status = await selector._check_provider_health("openai")
+        
+        probe.assert_awaited_once_with(LLMProvider.OPENAI)
+        assert status.health == expected
+        assert status.error_rate == (0.0 if expected == ProviderHealth.HEALTHY else 1.0)
+    
+    @pytest.mark.asyncio
+    async def test_probe_never_generates(self, selector):
+        """Health checks list models instead of billing a generation or touching readiness"""
+        generate = AsyncMock()
+        with patch.object(llm_manager, "_check_provider", AsyncMock(return_value={"status": "healthy"})), \
+             patch.object(llm_manager, "generate", generate):
+            await selector._check_provider_health("anthropic")
+        
+        generate.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_probe_exception_marks_unavailable(self, selector):
+        """A probe that raises leaves the provider unavailable"""
+        with patch.object(llm_manager, "_check_provider", AsyncMock(side_effect=KeyError(LLMProvider.GOOGLE))):
+            status = await selector._check_provider_health("google")
+        
+        assert status.health == ProviderHealth.UNAVAILABLE
+        assert selector._get_provider_models("google") == status.available_models
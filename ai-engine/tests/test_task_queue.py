@@ -0,0 +1,216 @@
+"""
+Tests for the out-of-process agent task queue and in-process admission control
+"""
+
+import asyncio
+import pytest
+import orjson
+from unittest.mock import Mock, patch
+
+from services import task_queue
+from services.agent_manager import AgentManager, AgentStatus, AgentTask, AgentType
+from services.llm_manager import LLMManager
+from core.exceptions import AgentCapacityError
+from main import app, agent_capacity_exception_handler, AGENT_RETRY_AFTER_SECONDS
+
+def make_result(state: str, result=None, successful: bool = False, failed: bool = False) -> Mock:
+    async_result = Mock()
+    async_result.state = state
+    async_result.result = result
+    async_result.successful.return_value = successful
+    async_result.failed.return_value = failed
+    return async_result
+
+class TestCeleryApp:
+    """Test backend selection"""
+    
+    def test_local_backend_by_default(self, monkeypatch):
+        """Without AGENT_TASK_BACKEND=celery no Celery app is created"""
+        monkeypatch.delenv("AGENT_TASK_BACKEND", raising=False)
+        assert task_queue._create_celery_app() is None
+    
+    def test_celery_backend_without_celery_installed(self, monkeypatch):
+        """Selecting celery when it is not installed falls back to in-process execution"""
+        monkeypatch.setenv("AGENT_TASK_BACKEND", "celery")
+        with patch.object(task_queue, "Celery", None):
+            assert task_queue._create_celery_app() is None
+    
+    def test_is_enabled_follows_celery_app(self):
+        """Tasks are dispatched to the queue only when a Celery app exists"""
+        with patch.object(task_queue, "celery_app", None):
+            assert task_queue.is_enabled() is False
+        with patch.object(task_queue, "celery_app", Mock()):
+            assert task_queue.is_enabled() is True
+
+class TestEnqueue:
+    """Test job submission"""
+    
+    @pytest.mark.parametrize("priority, expected", [("high", 1), ("normal", 5), ("low", 9), ("urgent", 5)])
+    def test_enqueue_maps_priority(self, priority, expected):
+        """Priorities map onto Celery priorities, unknown ones fall back to normal"""
+        execute = Mock()
+        execute.apply_async.return_value = Mock(id="job-1")
+        
+        with patch.object(task_queue, "execute_agent_task", execute, create=True):
+            job_id = task_queue.enqueue_agent_task("backend", "generate_api", "Build API", {"a": 1}, priority=priority)
+        
+        assert job_id == "job-1"
+        execute.apply_async.assert_called_once_with(
+            args=["backend", "generate_api", "Build API", {"a": 1}],
+            queue=task_queue.AGENT_QUEUE,
+            priority=expected
+        )
+
+class TestJobState:
+    """Test mapping of Celery result states onto agent task statuses"""
+    
+    @pytest.mark.parametrize("state, expected", [
+        ("PENDING", "idle"),
+        ("RECEIVED", "idle"),
+        ("STARTED", "running"),
+        ("RETRY", "running"),
+        ("REVOKED", "error"),
+        ("SOMETHING_NEW", "running"),
+    ])
+    def test_state_mapping(self, state, expected):
+        """Each Celery state maps to the matching agent status"""
+        with patch.object(task_queue, "AsyncResult", return_value=make_result(state)):
+            job_state = task_queue.get_job_state("job-1")
+        
+        assert job_state == {"status": expected, "result": None, "error": None}
+    
+    def test_success_carries_result(self):
+        """A successful job exposes its return value"""
+        async_result = make_result("SUCCESS", result={"code": "ok"}, successful=True)
+        with patch.object(task_queue, "AsyncResult", return_value=async_result):
+            job_state = task_queue.get_job_state("job-1")
+        
+        assert job_state == {"status": "completed", "result": {"code": "ok"}, "error": None}
+    
+    def test_failure_carries_error(self):
+        """A failed job exposes its exception as the error message"""
+        async_result = make_result("FAILURE", result=RuntimeError("boom"), failed=True)
+        with patch.object(task_queue, "AsyncResult", return_value=async_result):
+            job_state = task_queue.get_job_state("job-1")
+        
+        assert job_state == {"status": "error", "result": None, "error": "boom"}
+
+class TestQueuedTasks:
+    """Test the agent manager side of queued tasks"""
+    
+    @pytest.fixture
+    def agent_manager(self):
+        return AgentManager()
+    
+    @pytest.mark.asyncio
+    async def test_create_task_enqueues_when_enabled(self, agent_manager):
+        """With the queue enabled, the job id becomes the task id and nothing is queued in-process"""
+        with patch.object(task_queue, "is_enabled", return_value=True), \
+             patch.object(task_queue, "enqueue_agent_task", return_value="job-1") as enqueue:
+            task_id = await agent_manager.create_task(AgentType.BACKEND, "generate_api", "Build API", {}, priority=2)
+        
+        assert task_id == "job-1"
+        assert agent_manager.tasks["job-1"].metadata == {"priority": 2, "queued": True}
+        assert agent_manager.pending_tasks == 0
+        assert enqueue.call_args.kwargs["priority"] == "high"
+    
+    @pytest.mark.asyncio
+    async def test_get_task_status_refreshes_queued_task(self, agent_manager):
+        """Polling a queued task pulls its state from the result backend and publishes the change"""
+        task = AgentTask(id="job-1", metadata={"queued": True})
+        agent_manager.tasks[task.id] = task
+        updates = agent_manager.subscribe_task(task.id)
+        
+        state = {"status": "completed", "result": {"code": "ok"}, "error": None}
+        with patch.object(task_queue, "get_job_state", return_value=state):
+            refreshed = await agent_manager.get_task_status(task.id)
+        
+        assert refreshed.status == AgentStatus.COMPLETED
+        assert refreshed.output_data == {"code": "ok"}
+        assert updates.get_nowait()["status"] == "completed"
+    
+    @pytest.mark.asyncio
+    async def test_finished_queued_task_is_not_refreshed(self, agent_manager):
+        """Finished tasks never hit the result backend again"""
+        task = AgentTask(id="job-1", status=AgentStatus.COMPLETED, metadata={"queued": True})
+        agent_manager.tasks[task.id] = task
+        
+        with patch.object(task_queue, "get_job_state") as get_job_state:
+            await agent_manager.get_task_status(task.id)
+        
+        get_job_state.assert_not_called()
+
+class TestAgentCapacity:
+    """Test load shedding of in-process agent tasks"""
+    
+    @pytest.mark.asyncio
+    async def test_create_task_rejects_when_saturated(self):
+        """create_task raises once the pending budget is used up"""
+        agent_manager = AgentManager()
+        with patch("services.agent_manager.MAX_PENDING_AGENT_TASKS", 1), \
+             patch.object(task_queue, "is_enabled", return_value=False):
+            await agent_manager.create_task(AgentType.BACKEND, "generate_api", "first", {})
+            with pytest.raises(AgentCapacityError):
+                await agent_manager.create_task(AgentType.BACKEND, "generate_api", "second", {})
+        
+        assert agent_manager.pending_tasks == 1
+    
+    def test_handler_is_registered(self):
+        """The app maps AgentCapacityError to its dedicated handler"""
+        assert app.exception_handlers[AgentCapacityError] is agent_capacity_exception_handler
+    
+    @pytest.mark.asyncio
+    async def test_capacity_error_returns_503_with_retry_after(self):
+        """A saturated queue answers 503 and tells the client when to retry"""
+        response = await agent_capacity_exception_handler(Mock(url="http://test/agents"), AgentCapacityError("queue full"))
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == AGENT_RETRY_AFTER_SECONDS
+        body = orjson.loads(response.body)
+        assert body["error"] == "queue full"
+        assert body["status_code"] == 503
+
+class TestWorkerJobs:
+    """Test running jobs on per-job event loops"""
+    
+    def test_clients_are_not_reused_across_loops(self):
+        """A client cached on a finished loop is replaced on the next one"""
+        manager = LLMManager()
+        
+        async def get_client():
+            return manager._get_http_client()
+        
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        
+        assert first is not second
+        assert manager._owns_http_client is True
+    
+    def test_attached_client_is_kept(self):
+        """A client attached by its owner is never dropped or closed by the manager"""
+        manager = LLMManager()
+        shared = Mock()
+        manager.attach_http_client(shared)
+        
+        async def get_client():
+            client = manager._get_http_client()
+            await manager.close_http_clients()
+            return client
+        
+        assert asyncio.run(get_client()) is shared
+        assert manager.http_client is shared
+    
+    def test_run_closes_clients_opened_by_the_job(self):
+        """Each job's provider clients are closed before its loop goes away"""
+        manager = LLMManager()
+        
+        async def job():
+            return manager._get_http_client()
+        
+        with patch.object(task_queue, "llm_manager", manager):
+            client = task_queue._run(job())
+            assert client.is_closed
+            assert manager.http_client is None
+            
+            # The next job gets a fresh client on its own loop
+            assert task_queue._run(job()) is not client
@@ -0,0 +1,160 @@
+"""
+Tests for workflow step scheduling
+"""
+
+import gc
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from agents.workflows.workflow_engine import WORKFLOW_TTL_SECONDS, Workflow, WorkflowEngine, WorkflowStatus, WorkflowStep
+
+
+def make_step(step_id: str, *dependencies: str) -> WorkflowStep:
+    return WorkflowStep(
+        id=step_id,
+        name=step_id,
+        agent_type="backend",
+        task_type="test_task",
+        inputs={},
+        dependencies=dependencies
+    )
+
+
+def batch_ids(batches):
+    return [sorted(step.id for step in batch) for batch in batches]
+
+
+class TestWorkflowScheduling:
+    """Test dependency-ordered batching of workflow steps"""
+    
+    @pytest.fixture
+    def engine(self):
+        return WorkflowEngine()
+    
+    def test_independent_steps_share_a_batch(self, engine):
+        """Steps without dependencies run in one batch"""
+        steps = [make_step("a"), make_step("b"), make_step("c")]
+        
+        assert batch_ids(engine._schedule(steps)) == [["a", "b", "c"]]
+    
+    def test_dependencies_are_scheduled_first(self, engine):
+        """Each step lands in the batch after its last dependency"""
+        steps = [
+            make_step("deploy", "backend", "frontend"),
+            make_step("frontend", "design"),
+            make_step("backend", "design"),
+            make_step("design"),
+        ]
+        
+        assert batch_ids(engine._schedule(steps)) == [["design"], ["backend", "frontend"], ["deploy"]]
+    
+    def test_diamond_waits_for_both_branches(self, engine):
+        """A step with two dependencies at different depths runs after the deeper one"""
+        steps = [
+            make_step("a"),
+            make_step("b", "a"),
+            make_step("c", "b"),
+            make_step("d", "a", "c"),
+        ]
+        
+        assert batch_ids(engine._schedule(steps)) == [["a"], ["b"], ["c"], ["d"]]
+    
+    def test_unknown_dependencies_are_ignored_by_scheduler(self, engine):
+        """The scheduler skips dependencies that are not steps of the workflow"""
+        steps = [make_step("a", "missing")]
+        
+        assert batch_ids(engine._schedule(steps)) == [["a"]]
+    
+    def test_cycle_raises(self, engine):
+        """A circular dependency is reported with the blocked steps"""
+        steps = [make_step("root"), make_step("a", "root", "b"), make_step("b", "a")]
+        
+        with pytest.raises(ValueError, match="Circular dependency") as exc_info:
+            list(engine._schedule(steps))
+        
+        assert str(exc_info.value).endswith(": a, b")
+    
+    def test_self_dependency_raises(self, engine):
+        """A step depending on itself is a cycle"""
+        with pytest.raises(ValueError, match="Circular dependency"):
+            list(engine._schedule([make_step("a", "a")]))
+    
+    def test_validate_dependencies_rejects_unknown_step(self, engine):
+        """Validation rejects dependencies on steps outside the workflow"""
+        with pytest.raises(ValueError, match="Unknown dependency"):
+            engine._validate_dependencies([make_step("a", "missing")])
+    
+    def test_validate_dependencies_rejects_cycle(self, engine):
+        """Validation drains the scheduler, so cycles are rejected up front"""
+        with pytest.raises(ValueError, match="Circular dependency"):
+            engine._validate_dependencies([make_step("a", "b"), make_step("b", "a")])
+    
+    def test_validate_dependencies_accepts_dag(self, engine):
+        """A valid graph passes validation"""
+        engine._validate_dependencies([make_step("a"), make_step("b", "a")])
+
+
+def make_workflow(workflow_id: str, status: WorkflowStatus, finished_seconds_ago: float = 0) -> Workflow:
+    workflow = Workflow(
+        id=workflow_id,
+        name=workflow_id,
+        description="",
+        steps=[make_step("a")],
+        context=None,
+        status=status
+    )
+    if status != WorkflowStatus.RUNNING:
+        workflow.started_at = workflow.completed_at = datetime.utcnow() - timedelta(seconds=finished_seconds_ago)
+    return workflow
+
+
+class TestWorkflowPruning:
+    """Test archiving of finished workflows"""
+    
+    @pytest.fixture
+    def engine(self):
+        return WorkflowEngine()
+    
+    def test_prune_archives_expired_workflows(self, engine):
+        """Only workflows finished longer ago than the TTL leave active_workflows"""
+        for workflow in (
+            make_workflow("old", WorkflowStatus.COMPLETED, finished_seconds_ago=120),
+            make_workflow("recent", WorkflowStatus.FAILED, finished_seconds_ago=10),
+            make_workflow("running", WorkflowStatus.RUNNING),
+        ):
+            engine.active_workflows[workflow.id] = workflow
+        
+        assert engine.prune_workflows(ttl_seconds=60) == 1
+        assert set(engine.active_workflows) == {"recent", "running"}
+        assert list(engine.archived_workflows) == ["old"]
+    
+    def test_archived_status_outlives_the_workflow(self, engine):
+        """The archived summary is kept even though nothing else references the workflow"""
+        engine.active_workflows["old"] = make_workflow("old", WorkflowStatus.COMPLETED, finished_seconds_ago=120)
+        engine.prune_workflows(ttl_seconds=60)
+        gc.collect()
+        
+        status = engine.get_workflow_status("old")
+        assert status["workflow_id"] == "old"
+        assert status["status"] == "completed"
+    
+    def test_archive_is_bounded(self, engine):
+        """The oldest archived summaries are dropped once the archive is full"""
+        with patch("agents.workflows.workflow_engine.WORKFLOW_ARCHIVE_MAX_SIZE", 2):
+            for workflow_id in ("w1", "w2", "w3"):
+                engine.active_workflows[workflow_id] = make_workflow(workflow_id, WorkflowStatus.COMPLETED, finished_seconds_ago=120)
+                engine.prune_workflows(ttl_seconds=60)
+        
+        assert list(engine.archived_workflows) == ["w2", "w3"]
+        with pytest.raises(ValueError, match="Workflow not found"):
+            engine.get_workflow_status("w1")
+    
+    def test_create_workflow_prunes(self, engine):
+        """Creating a workflow archives expired ones"""
+        engine.active_workflows["old"] = make_workflow("old", WorkflowStatus.CANCELLED, finished_seconds_ago=2 * WORKFLOW_TTL_SECONDS)
+        
+        workflow_id = engine.create_workflow("new", "", [{"id": "a", "name": "a", "agent_type": "backend", "task_type": "t"}], None)
+        
+        assert list(engine.active_workflows) == [workflow_id]
+        assert "old" in engine.archived_workflows
@@ -0,0 +1,80 @@
+"""
+Tests for generation admission control
+"""
+
+import pytest
+import asyncio
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from ai_engine.api.routes import generation
+from ai_engine.services import metrics
+
+
+class TestAdmissionControl:
+    """Test load shedding of concurrent generation requests"""
+
+    @pytest.fixture
+    def collector(self):
+        """Replace the metrics collector so gauge updates can be inspected"""
+        collector = Mock()
+        with patch.object(generation, "metrics_collector", collector):
+            yield collector
+
+    @pytest.mark.asyncio
+    async def test_full_semaphore_returns_503_with_retry_after(self, collector):
+        """A request that finds every slot taken is rejected once the admission timeout passes"""
+        with patch.object(generation, "_inflight", asyncio.Semaphore(0)), \
+             patch.object(generation, "ADMISSION_TIMEOUT", 0.01):
+            with pytest.raises(HTTPException) as exc_info:
+                await generation._acquire_slot()
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": generation.ADMISSION_RETRY_AFTER_SECONDS}
+        collector.record_admission_rejection.assert_called_once_with()
+        collector.update_admission.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_slot_is_released_after_call(self, collector):
+        """The in-flight gauge follows acquire and release without scanning loop tasks"""
+        with patch.object(generation, "_inflight", asyncio.Semaphore(1)) as inflight, \
+             patch.object(generation, "_inflight_count", 0), \
+             patch("asyncio.all_tasks") as all_tasks:
+            async with generation._admitted():
+                assert inflight.locked()
+            assert not inflight.locked()
+
+        assert [c.args for c in collector.update_admission.call_args_list] == [(1,), (0,)]
+        all_tasks.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_waiting_request_is_admitted_when_a_slot_frees(self, collector):
+        """A request queued behind a full semaphore runs once a slot is released"""
+        with patch.object(generation, "_inflight", asyncio.Semaphore(1)), \
+             patch.object(generation, "_inflight_count", 0), \
+             patch.object(generation, "ADMISSION_TIMEOUT", 1.0):
+            await generation._acquire_slot()
+            waiter = asyncio.create_task(generation._acquire_slot())
+            await asyncio.sleep(0)
+            assert not waiter.done()
+
+            generation._release_slot()
+            await waiter
+            generation._release_slot()
+
+
+class TestEventLoopTaskGauge:
+    """Test sampling of the event-loop task gauge"""
+
+    @pytest.mark.asyncio
+    async def test_sampler_sets_loop_task_gauge_without_psutil(self):
+        """The loop task count is sampled in the background even when psutil is missing"""
+        collector = metrics.MetricsCollector()
+        collector._process = None
+
+        with patch.object(metrics, "event_loop_tasks") as gauge:
+            collector.start_resource_sampler()
+            await asyncio.sleep(0)
+            await collector.stop_resource_sampler()
+
+        gauge.set.assert_called_once()
+        assert gauge.set.call_args.args[0] >= 1